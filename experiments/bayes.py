@@ -3,12 +3,15 @@ import numpy as np
 import os
 import shutil
 import time
-import processor
+import feature_table
+import neighbors
+import metrics
 
 # Command-line parameters
 tf.flags.DEFINE_integer("k", 5, "Number of nearest neighbors to use in prediction (default: 5)")
+tf.flags.DEFINE_integer("max_k", 0, "Evaluate every k from 1 up to this instead (default: 0, just k)")
 tf.flags.DEFINE_integer("max_data", -1, "Maximum number of data points to use")
-tf.flags.DEFINE_string("data_file", "data/features.csv", 
+tf.flags.DEFINE_string("data_file", "data/features.csv",
             "File to read data from (default: 'data/features.csv')")
 
 F = tf.flags.FLAGS
@@ -16,13 +19,11 @@ F._parse_flags()
 
 # Get data
 print("Loading data...")
-x, y  = processor.load_data(F.data_file, F.max_data)
+x, y = feature_table.load_xy(F.data_file, F.max_data)
 print("Data loaded.")
 
 print("Preparing data...")
-x = np.array(x)
-y = np.array(y)
-num_features = x.shape[1]
+y = np.argmax(y, axis=1) # 0 for petitioner, 1 for respondent
 
 # split train vs  test
 amount = int(0.1 * len(x))
@@ -30,60 +31,39 @@ x_train, x_eval = x[:-amount], x[-amount:]
 y_train, y_eval = y[:-amount], y[-amount:]
 print("Data prepared.")
 
-count_petitioner = float(np.sum(y_train, axis=0)[0])
-count_respondent = len(y_train) - count_petitioner
+count_respondent = float(np.sum(y_train))
+count_petitioner = len(y_train) - count_respondent
 prob_petitioner = count_petitioner / len(y_train)
 prob_respondent = count_respondent / len(y_train)
 
-known = tf.placeholder("float32", [None, num_features])
-new = tf.placeholder("float32", [num_features])
-distance = tf.reduce_sum(tf.abs(known - new), reduction_indices=1)
-nearest, indices = tf.nn.top_k(distance, F.k)
+start_time = time.time()
+max_k = F.max_k or F.k
+nearest_indices = neighbors.nearest(x_train, x_eval, k=max_k)
+max_k = nearest_indices.shape[1]
 
-correct = 0
-precision = 0
-n_precision = 0
-recall = 0
-n_recall = 0
-with tf.Session() as session:
-    session.run(tf.initialize_all_variables())
+# column j holds the neighbor counts using the j+1 nearest neighbors
+num_respondent = np.cumsum(y_train[nearest_indices], axis=1)
+num_petitioner = np.arange(1, max_k + 1) - num_respondent
 
-    # for all test data
-    length = len(x_eval)
-    for i in range(length):
-        feed_data = {
-                known: x_train,
-                new: x_eval[i, :],
-            }
-        nearest_indices = session.run(indices, feed_data)
+likelihood_petitioner = num_petitioner / count_petitioner
+likelihood_respondent = num_respondent / count_respondent
 
-        # compute accuracy
-        counts = tf.argmax(y_train[nearest_indices], 1)
-        num_respondent = float(tf.reduce_sum(counts).eval())
-        num_petitioner = F.k - num_respondent
+unnorm_petitioner = prob_petitioner * likelihood_petitioner
+unnorm_respondent = prob_respondent * likelihood_respondent
+norm_constant = unnorm_petitioner + unnorm_respondent
 
-        likelihood_petitioner = num_petitioner / count_petitioner
-        likelihood_respondent = num_respondent / count_respondent
+post_petitioner = unnorm_petitioner / norm_constant
+post_respondent = unnorm_respondent / norm_constant
 
-        unnorm_petitioner = prob_petitioner * likelihood_petitioner
-        unnorm_respondent = prob_respondent * likelihood_respondent
-        norm_constant = unnorm_petitioner + unnorm_respondent
+predicted = np.where(post_petitioner > post_respondent, 0, 1)
+accuracy, precision, recall, _ = metrics.evaluate(predicted, y_eval)
+elapsed = time.time() - start_time
 
-        post_petitioner = unnorm_petitioner / norm_constant
-        post_respondent = unnorm_respondent / norm_constant
-
-        actual = np.argmax(y_eval[i, :])
-        predicted = 0 if post_petitioner >  post_respondent else 1
-        print([predicted, actual])
-        adj_amt = float(1 - abs(predicted - actual))
-        correct += adj_amt
-        if predicted == 1:
-            n_precision += 1
-            precision += adj_amt
-        if actual == 1:
-            n_recall += 1
-            recall += adj_amt
-
-    print("Accuracy: {:g}%".format(100 * correct/length))
-    print("Precision: {:g}%".format(100 * precision/n_precision))
-    print("Recall: {:g}%".format(100 * recall/n_recall))
+print("Evaluated {} cases in {:.3f}s.".format(len(y_eval), elapsed))
+ks = range(1, max_k + 1) if F.max_k else [max_k]
+for k in ks:
+    if F.max_k:
+        print("\nk = {}".format(k))
+    print("Accuracy: {:g}%".format(100 * accuracy[k - 1]))
+    print("Precision: {:g}%".format(100 * precision[k - 1]))
+    print("Recall: {:g}%".format(100 * recall[k - 1]))
@@ -0,0 +1,81 @@
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import re
+import sys
+import time
+
+import processor
+import tokenizer
+
+# Measures the throughput of tokenizer.normalize against the regex chain
+# processor.get_text used to run, after checking that they agree on every
+# utterance in the corpus.  The reference has the number rule fixed;
+# test_tokenizer.py checks normalize against the original's saved outputs.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--max_data", type=int, default=-1, help="Maximum number of arguments to use")
+parser.add_argument("--repeat", type=int, default=3, help="Number of timed passes over the corpus")
+args = parser.parse_args()
+
+# Edge cases that are rare in the transcripts
+EXTRA = [
+    "",
+    "   ",
+    "He said -- no, I don't think so.",
+    "It's 12:30, isn't it? (Laughter.)",
+    "a1b2c3d 45 (6) 7,8!9?",
+    "They'd've we'll you're I'VE N'T 's's",
+    "caf\u00e9 \u2014 \u00a7 1983's \"quoted\" `tick`",
+    "Section 1983(a)(2)",
+]
+
+def reference(text):
+    # the original processor.get_text chain, one utterance at a time.  The
+    # number rule's backreferences are raw strings here; the original wrote
+    # "\1 \2 \3", which replaced numbers with control characters.
+    text = re.sub(r"[^A-Za-z0-9(),!?\'\`]", " ", text)
+    text = re.sub(r"\'s", " \'s", text)
+    text = re.sub(r"\'ve", " \'ve", text)
+    text = re.sub(r"n\'t", " n\'t", text)
+    text = re.sub(r"\'re", " \'re", text)
+    text = re.sub(r"\'d", " \'d", text)
+    text = re.sub(r"\'ll", " \'ll", text)
+    text = re.sub(r",", " , ", text)
+    text = re.sub(r"!", " ! ", text)
+    text = re.sub(r"\(", r" \( ", text)
+    text = re.sub(r"\)", r" \) ", text)
+    text = re.sub(r"\?", r" \? ", text)
+    text = re.sub(r"(\D)(\d+)(\D)", r"\1 \2 \3", text)
+    text = re.sub(r"\s{2,}", " ", text)
+    return text.strip().lower()
+
+def throughput(function, texts):
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.time()
+        output = [function(text) for text in texts]
+        best = min(best, time.time() - start)
+    num_tokens = sum(len(text.split()) for text in output)
+    return num_tokens / best, best
+
+texts = EXTRA[:]
+for argument in processor.load_raw_data(args.max_data):
+    texts.extend(speaker.text for speaker in argument.speakers)
+print("Loaded {} utterances.".format(len(texts)))
+
+mismatches = [t for t in texts if tokenizer.normalize(t) != reference(t)]
+for text in mismatches[:10]:
+    print("MISMATCH: {!r}".format(text))
+    print("  expected {!r}".format(reference(text)))
+    print("  got      {!r}".format(tokenizer.normalize(text)))
+if mismatches:
+    print("{} of {} utterances differ.".format(len(mismatches), len(texts)))
+    sys.exit(1)
+print("All utterances match.")
+
+old_rate, old_time = throughput(reference, texts)
+new_rate, new_time = throughput(tokenizer.normalize, texts)
+print("regex chain:   {:,.0f} tokens/sec ({:.3f}s)".format(old_rate, old_time))
+print("single pass:   {:,.0f} tokens/sec ({:.3f}s)".format(new_rate, new_time))
+print("speedup:       {:.2f}x".format(new_rate / old_rate))
@@ -0,0 +1,25 @@
+import argparse
+import time
+
+import feature_store
+
+# Update data/features.csv from arguments/, recomputing only the cases whose
+# files changed since the last run.
+
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("--arguments_dir", default="arguments/",
+            help="Directory to read parsed arguments from")
+parser.add_argument("--features_file", default="data/features.csv",
+            help="File to write features to (default: 'data/features.csv')")
+parser.add_argument("--num_workers", type=int, default=0,
+            help="Processes to read arguments with (default: one per CPU)")
+parser.add_argument("--full", action="store_true",
+            help="Recompute every case, keeping the rows in their order (default: false)")
+F = parser.parse_args()
+
+start_time = time.time()
+recomputed, unchanged, dropped = feature_store.update(F.features_file, F.arguments_dir,
+        num_workers=F.num_workers, full=F.full)
+print("{} cases recomputed, {} unchanged, {} dropped in {:.3f}s."
+        .format(recomputed, unchanged, dropped, time.time() - start_time))
@@ -15,17 +15,18 @@ class Model(object):
 
         # Word embedding layer
         with tf.device("/cpu:0"), tf.name_scope("word_embedding"):
-            embedding_matrix = tf.Variable(
+            self.embedding_matrix = tf.Variable(
                     tf.random_uniform([vocab_size, embedding_size], -1.0, 1.0), # random numbers between -1 and 1
                     name="embedding_matrix")
-            lookup = tf.nn.embedding_lookup(embedding_matrix, self.input)
+            lookup = tf.nn.embedding_lookup(self.embedding_matrix, self.input)
             self.embedded_chars = tf.expand_dims(lookup, -1) # prepare for convolution layer
 
         # convolution and max pooling layer, for each filter
         pooled_outputs = []
         for i, filter_size in enumerate(filter_sizes):
             with tf.name_scope("convolution_max_pooling_size_%s" % filter_size):
-                # Convolution filter_shape = [filter_size, embedding_size, 1, num_filters] # each filter size has num_filters filters
+                # Convolution
+                filter_shape = [filter_size, embedding_size, 1, num_filters] # each filter size has num_filters filters
                 weights = tf.Variable(tf.truncated_normal(filter_shape, stddev=0.1), name="weights")
                 biases = tf.Variable(tf.constant(0.1, shape=[num_filters]), name="biases")
                 convolution = tf.nn.conv2d(
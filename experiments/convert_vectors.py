@@ -0,0 +1,23 @@
+import argparse
+import time
+
+import word_vectors
+
+# Convert a GloVe or word2vec text file to the memory-mapped format that
+# train.py --word_vectors reads.
+
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("text_file",
+            help="Vector file to convert, one 'word x1 x2 ...' line per word")
+parser.add_argument("--out_dir", default="vectors/",
+            help="Directory to write the converted vectors to (default: 'vectors/')")
+parser.add_argument("--max_words", type=int, default=0,
+            help="Keep only this many of the first words (default: 0, all of them)")
+F = parser.parse_args()
+
+print("Converting {}...".format(F.text_file))
+start_time = time.time()
+num_words, dim = word_vectors.convert(F.text_file, F.out_dir, F.max_words)
+print("Wrote {} vectors of {} dimensions to {} in {:.3f}s."
+        .format(num_words, dim, F.out_dir, time.time() - start_time))
@@ -0,0 +1,215 @@
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import json
+import os
+import numpy as np
+
+import processor
+
+# Bump when the on-disk layout changes
+CACHE_VERSION = 1
+# Anything that changes how utterances become tokens must be listed here, so
+# that a cache built with different settings is thrown away
+TOKENIZER = {
+    "normalizer": "tokenizer.normalize",
+    "split": "whitespace",
+    "version": 1,
+}
+# Token id 0 is reserved for padding, as with VocabularyProcessor
+PADDING_ID = 0
+
+ARRAYS = ["tokens", "offsets", "sides", "outputs"]
+
+class Corpus(object):
+    """
+    A tokenized argument corpus, backed by memory-mapped NumPy arrays.
+
+    The tokens of utterance i are tokens[offsets[i]:offsets[i+1]].  sides[i] is
+    0, 1 or 2 for petitioner, respondent or neither, and outputs[i] is the
+    outcome of the argument the utterance is from.
+    """
+    def __init__(self, tokens, offsets, sides, outputs, vocabulary):
+        self.tokens = tokens
+        self.offsets = offsets
+        self.sides = sides
+        self.outputs = outputs
+        self.vocabulary = vocabulary
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def utterance(self, i):
+        return self.tokens[self.offsets[i] : self.offsets[i + 1]]
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def side_vectors(self):
+        return np.eye(3, dtype=np.int32)[self.sides]
+
+    def vocab_size(self):
+        return len(self.vocabulary) + 1 # plus padding
+
+    def padded(self, max_words=None):
+        lengths = self.lengths()
+        if max_words is None:
+            max_words = int(lengths.max()) if len(lengths) else 0
+        text = np.full([len(self), max_words], PADDING_ID, dtype=np.int32)
+        # scatter every token into its (row, column) slot in one go
+        rows = np.repeat(np.arange(len(self)), lengths)
+        columns = np.arange(len(self.tokens)) - np.repeat(self.offsets[:-1], lengths)
+        keep = columns < max_words
+        text[rows[keep], columns[keep]] = self.tokens[keep]
+        return text
+
+def load_corpus(cache_dir, max_count=-1, arguments_dir=processor.ARGUMENTS_DIR):
+    """
+    Load the tokenized corpus from cache_dir, first reprocessing any argument
+    files that are new or have changed since the cache was written.
+    """
+    filenames = processor.argument_files(arguments_dir)
+    if max_count >= 0:
+        filenames = filenames[:max_count]
+
+    manifest = read_manifest(cache_dir)
+    old_files = manifest["files"]
+    new_files = {}
+    stale = []
+    for filename in filenames:
+        name = os.path.basename(filename)
+        stat = os.stat(filename)
+        entry = old_files.get(name)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            new_files[name] = entry
+            continue
+
+        digest = file_hash(filename)
+        if entry and entry["sha1"] == digest: # touched, but not changed
+            entry = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+        else:
+            entry = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest}
+            stale.append(name)
+        new_files[name] = entry
+
+    names = [os.path.basename(f) for f in filenames]
+    if not stale and names == manifest["order"]:
+        if any(new_files[n] != old_files[n] for n in names):
+            manifest["files"] = new_files
+            write_manifest(cache_dir, manifest)
+        return open_corpus(cache_dir, manifest["vocabulary"])
+
+    rebuild(cache_dir, arguments_dir, manifest, names, new_files, stale)
+    return open_corpus(cache_dir, read_manifest(cache_dir)["vocabulary"])
+
+def rebuild(cache_dir, arguments_dir, manifest, names, files, stale):
+    old = open_corpus(cache_dir, manifest["vocabulary"]) if manifest["order"] else None
+    vocabulary = manifest["vocabulary"] # only ever appended to, so ids stay valid
+    word_ids = {word: i + 1 for i, word in enumerate(vocabulary)}
+    # parse the changed files in the background, in the order they're needed
+    parsed = processor.parse_files([os.path.join(arguments_dir, name) for name in stale])
+    stale = set(stale)
+
+    tokens = []
+    lengths = []
+    sides = []
+    outputs = []
+    count = 0
+    for name in names:
+        entry = files[name]
+        if name in stale:
+            argument = next(parsed)
+            file_tokens, file_lengths, file_sides, file_outputs = \
+                    tokenize_argument(argument, word_ids, vocabulary)
+        else: # copy the already-tokenized utterances out of the old cache
+            start, stop = entry["start"], entry["stop"]
+            file_tokens = old.tokens[old.offsets[start] : old.offsets[stop]]
+            file_lengths = np.diff(old.offsets[start : stop + 1])
+            file_sides = old.sides[start : stop]
+            file_outputs = old.outputs[start : stop]
+
+        entry["start"] = count
+        count += len(file_sides)
+        entry["stop"] = count
+        tokens.append(np.asarray(file_tokens, dtype=np.int32))
+        lengths.append(np.asarray(file_lengths, dtype=np.int64))
+        sides.append(np.asarray(file_sides, dtype=np.int8))
+        outputs.append(np.asarray(file_outputs, dtype=np.int8).reshape(-1, 2))
+
+    lengths = concatenate(lengths, np.int64)
+    arrays = {
+        "tokens": concatenate(tokens, np.int32),
+        "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        "sides": concatenate(sides, np.int8),
+        "outputs": concatenate(outputs, np.int8).reshape(-1, 2),
+    }
+    del old, tokens, lengths, sides, outputs # release the memory maps before overwriting their files
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    for key in ARRAYS:
+        path = os.path.join(cache_dir, key + ".npy")
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            np.save(f, arrays[key])
+        os.rename(temp, path)
+
+    write_manifest(cache_dir, {
+        "version": CACHE_VERSION,
+        "tokenizer": TOKENIZER,
+        "order": names,
+        "files": files,
+        "vocabulary": vocabulary,
+    })
+
+def tokenize_argument(argument, word_ids, vocabulary):
+    tokens = []
+    lengths = []
+    sides = []
+    outputs = []
+    for text, id_vec, output in processor.utterances(argument):
+        words = text.split()
+        for word in words:
+            if word not in word_ids:
+                vocabulary.append(word)
+                word_ids[word] = len(vocabulary)
+            tokens.append(word_ids[word])
+        lengths.append(len(words))
+        sides.append(id_vec.index(1))
+        outputs.append(output)
+    return tokens, lengths, sides, outputs
+
+def open_corpus(cache_dir, vocabulary):
+    arrays = [np.load(os.path.join(cache_dir, key + ".npy"), mmap_mode="r")
+            for key in ARRAYS]
+    return Corpus(*arrays, vocabulary=vocabulary)
+
+def read_manifest(cache_dir):
+    empty = {"order": [], "files": {}, "vocabulary": []}
+    try:
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return empty
+
+    if manifest.get("version") != CACHE_VERSION or manifest.get("tokenizer") != TOKENIZER:
+        return empty
+    return manifest
+
+def write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.rename(path + ".tmp", path)
+
+def file_hash(filename):
+    sha1 = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def concatenate(arrays, dtype):
+    if not arrays:
+        return np.zeros([0], dtype=dtype)
+    return np.concatenate(arrays).astype(dtype, copy=False)
@@ -4,7 +4,7 @@ import os
 import shutil
 import time
 
-import processor
+import feature_table
 from model import Model
 
 # Command-line parameters
@@ -18,17 +18,14 @@ F._parse_flags()
 
 # Get data
 print("Loading data...")
-x, y  = processor.load_data(F.data_file)
+x, y = feature_table.load_xy(F.data_file)
 print("Data loaded.")
 
 print("Preparing data...")
-if F.eval_all:
-    x = np.array(x)
-    y = np.array(y)
-else:
+if not F.eval_all:
     amount = int(0.1 * len(x))
-    x = np.array(x)[-amount:]
-    y = np.array(y)[-amount:]
+    x = x[-amount:]
+    y = y[-amount:]
 print("Data prepared.")
 
 print("Initializing model...")
@@ -0,0 +1,55 @@
+import tensorflow as tf
+import numpy as np
+import os
+
+import numpy_model
+from model import restored_tensors
+
+# Command-line parameters
+tf.flags.DEFINE_string("dir", "", "Directory to read network from")
+tf.flags.DEFINE_string("out_file", "", "File to write weights to (default: 'model.npz' in dir)")
+tf.flags.DEFINE_integer("num_checks", 1000, "Random inputs to compare the two forward passes on (default: 1000)")
+
+F = tf.flags.FLAGS
+F._parse_flags()
+
+checkpoint_file = tf.train.latest_checkpoint(F.dir)
+out_file = F.out_file or os.path.join(F.dir, "model.npz")
+print("Reading checkpoint from {}".format(checkpoint_file))
+graph = tf.Graph()
+with graph.as_default():
+    with tf.Session() as session:
+        # load network
+        saver = tf.train.import_meta_graph("{}.meta".format(checkpoint_file))
+        saver.restore(session, checkpoint_file)
+
+        def value(name):
+            return session.run(graph.get_tensor_by_name(name + ":0"))
+
+        # hidden_1/weights_1, hidden_2/weights_2, ... until one is missing
+        weights = []
+        biases = []
+        layer = 1
+        while True:
+            try:
+                weights.append(value("hidden_%d/weights_%d" % (layer, layer)))
+                biases.append(value("hidden_%d/biases_%d" % (layer, layer)))
+            except KeyError:
+                break
+            layer += 1
+        model = numpy_model.Model(
+                weights = weights,
+                biases = biases,
+                weights_output = value("output/weights_output"),
+                biases_output = value("output/biases_output"),
+            )
+        model.save(out_file)
+        print("Wrote {} hidden layers to {}".format(len(weights), out_file))
+
+        # check the exported model against the graph
+        input_x, dropout_prob, _, probabilities = restored_tensors(graph)
+
+        x = np.random.rand(F.num_checks, weights[0].shape[0] if weights else model.weights_output.shape[0])
+        expected = session.run(probabilities, {input_x: x, dropout_prob: 1.0})
+        actual = numpy_model.load(out_file).probabilities(x)
+        print("Largest difference from TensorFlow: {:g}".format(np.max(np.abs(expected - actual))))
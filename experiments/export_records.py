@@ -0,0 +1,28 @@
+import tensorflow as tf
+import time
+
+import corpus_cache
+import records
+
+# Write the tokenized corpus to sharded TFRecord files for train.py --records_dir
+
+# Command-line parameters
+tf.flags.DEFINE_string("cache_dir", "cache/", "Directory to cache the tokenized corpus in (default: 'cache/')")
+tf.flags.DEFINE_string("out_dir", "records/", "Directory to write shards to (default: 'records/')")
+tf.flags.DEFINE_integer("max_data", -1, "Maximum number of arguments to use")
+tf.flags.DEFINE_integer("examples_per_shard", 10000, "Utterances per shard (default: 10000)")
+tf.flags.DEFINE_integer("seed", 0, "Seed for the order utterances are written in (default: 0)")
+
+F = tf.flags.FLAGS
+F._parse_flags()
+
+print("Loading corpus...")
+start_time = time.time()
+corpus = corpus_cache.load_corpus(F.cache_dir, F.max_data)
+print("Corpus loaded in {:.3f}s.".format(time.time() - start_time))
+
+print("Writing shards...")
+start_time = time.time()
+metadata = records.export_corpus(corpus, F.out_dir, F.examples_per_shard, F.seed)
+print("Wrote {} utterances to {} shards in {} in {:.3f}s."
+        .format(metadata["num_examples"], len(metadata["shards"]), F.out_dir, time.time() - start_time))
@@ -0,0 +1,195 @@
+from __future__ import absolute_import, division, print_function
+
+import csv
+import io
+import json
+import os
+import re
+import numpy as np
+
+import processor
+import thresholds
+from corpus_cache import file_hash
+
+# data/features.csv kept up to date from arguments/, recomputing only the
+# cases whose transcripts changed.  The counting is extractFeatures and the
+# columns createFeatures from parser.js.
+
+SIDES = ["petitioner", "respondent", "justices"]
+
+COLUMNS = ["caseNumber", "p_minus_r",
+        "p_interruptions", "p_words", "p_times", "p_laughter", "p_num_counsel", "p_num_int_by",
+        "r_interruptions", "r_words", "r_times", "r_laughter", "r_num_counsel", "r_num_int_by",
+        "j_interruptions", "j_words", "j_times", "j_laughter", "j_num_int_by",
+        "side", "margin", "j_num"]
+
+WHITESPACE = re.compile(r"\s+")
+LAUGHTER = re.compile(r"laughter", re.IGNORECASE)
+
+def count_summaries(people, speakers):
+    """
+    side_summaries for a list of people and the processor.Speakers of a
+    transcript, as extractFeatures computes them: per side, interruptions
+    (turns ending in "--"), words, turns, laughter, and the number of
+    distinct people who interrupted the side.
+    """
+    person_sides = np.array([SIDES.index(person["side"]) if person.get("side") in SIDES else -1
+            for person in people] + [-1], dtype=np.int64) # the extra -1 is for unknown ids
+    ids = np.array([speaker.id for speaker in speakers], dtype=np.int64)
+    texts = [speaker.text for speaker in speakers]
+
+    known = (ids >= 0) & (ids < len(people))
+    sides = person_sides[np.where(known, ids, len(people))]
+    words = np.array([len(WHITESPACE.split(text)) for text in texts], dtype=np.int64)
+    interrupted = np.array([text.endswith("--") or text.endswith("- -") for text in texts], dtype=bool)
+    laughed = np.array([LAUGHTER.search(text) is not None for text in texts], dtype=bool)
+
+    counted = sides >= 0
+    per_side = lambda weights: np.bincount(sides[counted], weights=weights[counted], minlength=3).astype(np.int64)
+
+    # whoever speaks next interrupted; a final "--" has no one to blame
+    blamed = interrupted[:-1] & counted[:-1]
+    pairs = np.unique(np.stack([sides[:-1][blamed], ids[1:][blamed]], axis=1), axis=0)
+    num_int_by = np.bincount(pairs[:, 0], minlength=3)
+
+    return [{
+        "side": side,
+        "interruptions": int(per_side(interrupted)[i]),
+        "words_spoken": int(per_side(words)[i]),
+        "times_spoken": int(per_side(np.ones_like(words))[i]),
+        "laughter": int(per_side(laughed)[i]),
+        "num_int_by": int(num_int_by[i]),
+    } for i, side in enumerate(SIDES)]
+
+def side_summaries(argument):
+    """
+    The argument's side summaries, recounted from its transcript.  parser.js
+    saves arguments with only the justices' turns, after counting the full
+    transcript, so for those the saved summaries are kept.
+    """
+    counsel_spoke = any(0 <= speaker.id < len(argument.people)
+            and argument.people[speaker.id].get("side") in SIDES[:2]
+            for speaker in argument.speakers)
+    if not counsel_spoke and argument.side_summaries:
+        return argument.side_summaries
+    return count_summaries(argument.people, argument.speakers)
+
+def feature_row(argument):
+    """
+    The features.csv row for an argument, as strings, or None if parser.js
+    would skip it: no outcome, or no words found for one of the counsel.
+    """
+    summaries = side_summaries(argument)
+    pet, resp, jus = [next(s for s in summaries if s["side"] == side) for side in SIDES]
+    if not argument.outcome or pet["words_spoken"] == 0 or resp["words_spoken"] == 0:
+        return None
+
+    p_words = float(pet["words_spoken"])
+    p_times = float(pet["times_spoken"])
+    row = {
+        "caseNumber": argument.case_number,
+        "p_minus_r": (pet["interruptions"] - resp["interruptions"]) / p_words,
+        "p_num_counsel": len(argument.petitioner["counsel"]),
+        "r_num_counsel": len(argument.respondent["counsel"]),
+        "side": 1 if argument.outcome["side"] == "petitioner" else 0,
+        "margin": argument.outcome["margin"],
+        "j_num": argument.num_justices,
+    }
+    # createFeatures divides everything by the petitioner's counts
+    for prefix, summary in [("p_", pet), ("r_", resp), ("j_", jus)]:
+        row[prefix + "interruptions"] = summary["interruptions"] / p_words
+        row[prefix + "words"] = summary["words_spoken"] / p_times
+        row[prefix + "times"] = summary["times_spoken"] / p_words
+        row[prefix + "laughter"] = summary["laughter"] / p_words
+        row[prefix + "num_int_by"] = summary["num_int_by"]
+
+    return dict((key, value if key == "caseNumber" else thresholds.format_number(value))
+            for key, value in row.items())
+
+def update(features_file, arguments_dir=processor.ARGUMENTS_DIR, num_workers=None, full=False):
+    """
+    Bring features_file up to date with the argument files in arguments_dir.
+    Cases whose files are new or changed (by content hash), or every case
+    with full, are recomputed.  Rows already in features_file keep their
+    place, so the train/eval splits taken from the top and bottom of the
+    file don't move; new cases go first, in reverse filename order, as
+    parser.js prepends them.  Rows for cases that no file produces any more
+    are dropped.  Returns the numbers of cases recomputed, unchanged and
+    dropped.
+    """
+    manifest = {} if full else read_manifest(features_file)
+    rows = read_rows(features_file)
+
+    filenames = processor.argument_files(arguments_dir)
+    new_manifest = {}
+    stale = []
+    for filename in filenames:
+        name = os.path.basename(filename)
+        stat = os.stat(filename)
+        entry = manifest.get(name)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            new_manifest[name] = entry
+            continue
+        digest = file_hash(filename)
+        if entry and entry["sha1"] == digest:
+            new_manifest[name] = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+            continue
+        new_manifest[name] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest}
+        stale.append(filename)
+
+    new_rows = []
+    recomputed = set()
+    for filename, argument in zip(stale, processor.parse_files(stale, num_workers=num_workers)):
+        new_manifest[os.path.basename(filename)]["case"] = argument.case_number
+        recomputed.add(argument.case_number)
+        row = feature_row(argument)
+        if row is not None:
+            new_rows.append(row)
+    new_rows.reverse() # parser.js puts the last parsed first
+
+    # a row stays if its case comes from an unchanged file, or is replaced
+    # where it is if the case was recomputed; anything else is gone
+    unchanged = set(entry["case"] for entry in new_manifest.values()
+            if "case" in entry) - recomputed
+    upserts = dict((row["caseNumber"], row) for row in new_rows)
+    kept = [upserts.pop(row["caseNumber"], row) for row in rows
+            if row["caseNumber"] in unchanged or row["caseNumber"] in upserts]
+    gone = len(set(row["caseNumber"] for row in rows)) - len(set(row["caseNumber"] for row in kept))
+    added = [row for row in new_rows if row["caseNumber"] in upserts]
+
+    write_rows(features_file, added + kept)
+    write_manifest(features_file, new_manifest)
+    return len(stale), len(filenames) - len(stale), gone
+
+def read_rows(filename):
+    if not os.path.exists(filename):
+        return []
+    with io.open(filename, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def write_rows(filename, rows):
+    # one row per case, the first one seen, as parser.js dedupes
+    seen = set()
+    with io.open(filename + ".tmp", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            if row["caseNumber"] in seen:
+                continue
+            seen.add(row["caseNumber"])
+            writer.writerow(row)
+    os.rename(filename + ".tmp", filename)
+
+def manifest_file(filename):
+    return filename + ".manifest.json"
+
+def read_manifest(filename):
+    try:
+        with open(manifest_file(filename)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def write_manifest(filename, manifest):
+    with open(manifest_file(filename), "w") as f:
+        json.dump(manifest, f)
@@ -0,0 +1,174 @@
+from __future__ import absolute_import, division, print_function
+
+import csv
+import io
+import json
+import os
+import shutil
+import numpy as np
+
+# Typed, columnar access to data/features.csv.  The first load of a CSV
+# parses it once into one .npy file per column in a sidecar directory;
+# later loads memory-map only the columns asked for, until the CSV changes.
+
+# Every column but caseNumber, with the type it is stored as.  Ratios stay
+# float64 so that they round-trip the CSV exactly (py-bayes.py must agree
+# with bayes.js to the last digit); matrices are float32 unless asked.
+SCHEMA = [
+    ("p_minus_r", np.float64),
+    ("p_interruptions", np.float64),
+    ("p_words", np.float64),
+    ("p_times", np.float64),
+    ("p_laughter", np.float64),
+    ("p_num_counsel", np.int32),
+    ("p_num_int_by", np.int32),
+    ("r_interruptions", np.float64),
+    ("r_words", np.float64),
+    ("r_times", np.float64),
+    ("r_laughter", np.float64),
+    ("r_num_counsel", np.int32),
+    ("r_num_int_by", np.int32),
+    ("j_interruptions", np.float64),
+    ("j_words", np.float64),
+    ("j_times", np.float64),
+    ("j_laughter", np.float64),
+    ("j_num_int_by", np.int32),
+    ("side", np.int32),
+    ("margin", np.int32),
+    ("j_num", np.int32),
+]
+TYPES = dict(SCHEMA)
+
+# The inputs of the linear models, kNN and the MLP evaluation
+FEATURES = [name for name, _ in SCHEMA if name not in ("side", "margin")]
+
+CACHE_VERSION = 1
+
+class FeatureTable(object):
+    """
+    Some columns of a features file: case_numbers, and a typed array for
+    every column in columns.
+    """
+    def __init__(self, case_numbers, columns):
+        self.case_numbers = case_numbers
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.case_numbers)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def matrix(self, names, dtype=np.float32):
+        """
+        A contiguous [cases, len(names)] matrix of the named columns.
+        """
+        matrix = np.empty([len(self), len(names)], dtype=dtype)
+        for i, name in enumerate(names):
+            matrix[:, i] = self.columns[name]
+        return matrix
+
+    def labels(self):
+        """
+        One-hot outcomes, [petitioner won, respondent won], as the models
+        are trained on.
+        """
+        side = self.columns["side"]
+        return np.stack([side, 1 - side], axis=1).astype(np.float32)
+
+    def margins(self):
+        """
+        The winning side's margin of votes, one [1] row per case, as the
+        margin output of model.py is trained on.
+        """
+        return np.asarray(self.columns["margin"], dtype=np.float32)[:, None]
+
+    def votes(self):
+        """
+        Votes for the petitioner, as util.prepData counts them.
+        """
+        side, margin = self.columns["side"], self.columns["margin"]
+        return np.where(side == 1, margin, self.columns["j_num"] - margin)
+
+    def take(self, indices):
+        return FeatureTable(self.case_numbers[indices],
+                dict((name, column[indices]) for name, column in self.columns.items()))
+
+def load(filename, columns=None, max_count=-1):
+    """
+    A FeatureTable of the given columns (default: all of them) of the first
+    max_count cases (default: all of them) in filename.
+    """
+    columns = [name for name, _ in SCHEMA] if columns is None else list(columns)
+    unknown = [name for name in columns if name not in TYPES]
+    if unknown:
+        raise KeyError("Not in the features schema: {}".format(", ".join(unknown)))
+
+    cache_dir = cache_directory(filename)
+    if not cache_is_fresh(filename, cache_dir):
+        write_cache(filename, cache_dir)
+
+    count = None if max_count < 0 else max_count
+    read = lambda name: np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r")[:count]
+    return FeatureTable(read("caseNumber"), dict((name, read(name)) for name in columns))
+
+LABELS = {
+    "side": (["side"], FeatureTable.labels),
+    "margin": (["margin"], FeatureTable.margins),
+    "votes": (["side", "margin", "j_num"], FeatureTable.votes),
+}
+
+def load_xy(filename, max_count=-1, columns=FEATURES, dtype=np.float32, labels="side"):
+    """
+    The feature matrix of filename and its labels, in one call: one-hot
+    sides, margins or petitioner votes.
+    """
+    if labels not in LABELS:
+        raise ValueError("labels must be one of {}, not {!r}".format(", ".join(sorted(LABELS)), labels))
+    label_columns, label_function = LABELS[labels]
+    table = load(filename, list(columns) + [name for name in label_columns if name not in columns], max_count)
+    return table.matrix(columns, dtype), label_function(table)
+
+def cache_directory(filename):
+    return filename + ".columns"
+
+def cache_is_fresh(filename, cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (IOError, ValueError):
+        return False
+    stat = os.stat(filename)
+    return (meta.get("version") == CACHE_VERSION
+            and meta.get("mtime") == stat.st_mtime and meta.get("size") == stat.st_size)
+
+def write_cache(filename, cache_dir):
+    stat = os.stat(filename)
+    with io.open(filename, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        cells = list(reader)
+
+    missing = [name for name in ["caseNumber"] + list(TYPES) if name not in header]
+    if missing:
+        raise ValueError("{} has no {} column".format(filename, ", ".join(missing)))
+
+    # build the whole cache beside the old one, then swap it in, so that an
+    # interrupted run never leaves a meta.json that doesn't match the columns
+    temp_dir = cache_dir + ".tmp"
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+    position = dict((name, i) for i, name in enumerate(header))
+    case_numbers = np.array([row[position["caseNumber"]] for row in cells], dtype=np.str_)
+    np.save(os.path.join(temp_dir, "caseNumber.npy"), case_numbers)
+    for name, dtype in SCHEMA:
+        # "" is 0, as +"" is in JS
+        values = np.array([row[position[name]] or "0" for row in cells])
+        np.save(os.path.join(temp_dir, name + ".npy"), values.astype(np.float64).astype(dtype))
+    with open(os.path.join(temp_dir, "meta.json"), "w") as f:
+        json.dump({"version": CACHE_VERSION, "mtime": stat.st_mtime, "size": stat.st_size}, f)
+
+    if os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.rename(temp_dir, cache_dir)
@@ -0,0 +1,121 @@
+from __future__ import absolute_import, division, print_function
+
+import re
+import numpy as np
+
+# Predictions while an argument is still going on.  LiveArgument keeps the
+# counts behind side_summaries (see extractFeatures in parser.js) up to date
+# one utterance at a time, and LivePredictor turns them into a Naive Bayes
+# probability after every utterance.
+
+SIDES = ["petitioner", "respondent", "justices"]
+
+WHITESPACE = re.compile(r"\s+")
+LAUGHTER = re.compile(r"laughter", re.IGNORECASE)
+
+class LiveArgument(object):
+    """
+    Running side summaries of an argument.  people is the argument's list
+    of people; the id of an utterance is a position in it, as in parser.js.
+    """
+    def __init__(self, people, petitioner_counsel, respondent_counsel, num_justices):
+        self.person_sides = [SIDES.index(person["side"]) if person.get("side") in SIDES else None
+                for person in people]
+        self.num_counsel = [petitioner_counsel, respondent_counsel]
+        self.num_justices = num_justices
+
+        self.interruptions = [0, 0, 0]
+        self.words_spoken = [0, 0, 0]
+        self.times_spoken = [0, 0, 0]
+        self.laughter = [0, 0, 0]
+        self.interrupted_by = [set(), set(), set()]
+        self.interrupted = None # side waiting to learn who interrupted it
+        self.count = 0
+
+    def add(self, id, text):
+        """
+        Count one utterance.  This takes constant time apart from reading
+        the text itself.
+        """
+        self.count += 1
+        if self.interrupted is not None:
+            # parser.js blames whoever speaks next
+            self.interrupted_by[self.interrupted].add(id)
+            self.interrupted = None
+
+        side = self.person_sides[id] if 0 <= id < len(self.person_sides) else None
+        if side is None:
+            return
+        if text.endswith("--") or text.endswith("- -"):
+            self.interruptions[side] += 1
+            self.interrupted = side
+        self.words_spoken[side] += len(WHITESPACE.split(text)) # like text.split(/\s+/) in JS
+        self.times_spoken[side] += 1
+        if LAUGHTER.search(text):
+            self.laughter[side] += 1
+
+    def side_summaries(self):
+        return [{
+            "side": side,
+            "interruptions": self.interruptions[i],
+            "words_spoken": self.words_spoken[i],
+            "times_spoken": self.times_spoken[i],
+            "laughter": self.laughter[i],
+            "num_int_by": len(self.interrupted_by[i]),
+        } for i, side in enumerate(SIDES)]
+
+    def features(self):
+        """
+        The features of createFeatures in parser.js and util.prepData, by
+        name.  Ratios whose denominator is still 0 are NaN.
+        """
+        pet_words = float(self.words_spoken[0]) or np.nan
+        pet_times = float(self.times_spoken[0]) or np.nan
+        features = {"j_num": self.num_justices}
+        for i, prefix in enumerate(["p_", "r_", "j_"]):
+            features[prefix + "interruptions"] = self.interruptions[i] / pet_words
+            features[prefix + "words"] = self.words_spoken[i] / pet_times
+            features[prefix + "times"] = self.times_spoken[i] / pet_words
+            features[prefix + "laughter"] = self.laughter[i] / pet_words
+            features[prefix + "num_int_by"] = len(self.interrupted_by[i])
+        features["p_num_counsel"], features["r_num_counsel"] = self.num_counsel
+        features["p_minus_r"] = (self.interruptions[0] - self.interruptions[1]) / pet_words
+        features["int_diff"] = features["p_interruptions"] - features["r_interruptions"]
+        features["words_diff"] = features["p_words"] - features["r_words"]
+        features["counsel_diff"] = features["p_num_counsel"] - features["r_num_counsel"]
+        return features
+
+class LivePredictor(object):
+    """
+    Petitioner win probabilities from a naive_bayes.Model, given the
+    features of a LiveArgument.  Features the stream can't supply (the SCDB
+    ones, say) or can't compute yet are left out, which for Naive Bayes is
+    the same as averaging over them.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.means = model.means
+        self.log_variances = np.log(2 * np.pi * model.variances)
+        self.precisions = 1 / model.variances
+        self.log_prior = np.log([model.prior, 1 - model.prior])
+
+    def predict(self, features):
+        x = np.array([features.get(key, np.nan) for key in self.model.keys], dtype=np.float64)
+        present = ~np.isnan(x)
+        x = x[present]
+        log_likelihood = -0.5 * np.sum((x - self.means[:, present])**2 * self.precisions[:, present]
+                + self.log_variances[:, present], axis=1)
+        log_joint = self.log_prior + log_likelihood
+        return 1 / (1 + np.exp(log_joint[1] - log_joint[0]))
+
+def replay(argument, predictor, num_justices=None):
+    """
+    Feed the utterances of a processor.Argument through a LiveArgument one
+    at a time, yielding the probability after each one.
+    """
+    live = LiveArgument(argument.people,
+            len(argument.petitioner["counsel"]), len(argument.respondent["counsel"]),
+            num_justices or argument.num_justices or 9)
+    for speaker in argument.speakers:
+        live.add(speaker.id, speaker.text)
+        yield live, predictor.predict(live.features())
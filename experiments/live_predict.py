@@ -0,0 +1,73 @@
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import processor
+import naive_bayes
+import live
+
+# Naive Bayes predictions that update after every utterance.  Reads a stream
+# of JSON lines on stdin: first an argument header with "petitioner",
+# "respondent" and "people" as in arguments/*.json (and optionally
+# "num_justices"), then one {"id", "sideBefore", "text"} speaker per line.
+# With --case, replays a parsed argument as if it were a stream instead.
+# Writes one {"utterance", "petitioner"} line per prediction.
+
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("--thresholds_file", default="data/thresholds.csv",
+            help="File to read the Naive Bayes model from (default: 'data/thresholds.csv')")
+parser.add_argument("--case", default="",
+            help="Case to replay from arguments_dir (default: read stdin)")
+parser.add_argument("--arguments_dir", default="arguments/",
+            help="Directory to read parsed arguments from")
+parser.add_argument("--num_justices", type=int, default=0,
+            help="Number of justices on the court (default: from the argument, or 9)")
+parser.add_argument("--every", type=int, default=1,
+            help="Write a prediction after this many utterances (default: 1)")
+parser.add_argument("--quiet", action="store_true",
+            help="Only write the final prediction (default: false)")
+F = parser.parse_args()
+
+predictor = live.LivePredictor(naive_bayes.load_thresholds(F.thresholds_file))
+
+def write(count, prob):
+    print(json.dumps({"utterance": count, "petitioner": float(prob)}))
+
+def stream_stdin():
+    header = json.loads(sys.stdin.readline())
+    argument = live.LiveArgument(header.get("people", []),
+            len(header["petitioner"]["counsel"]), len(header["respondent"]["counsel"]),
+            F.num_justices or header.get("num_justices") or 9)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        speaker = json.loads(line)
+        argument.add(speaker["id"], speaker.get("text", ""))
+        yield argument, predictor.predict(argument.features())
+
+if F.case:
+    argument = processor.load_argument(os.path.join(F.arguments_dir, "{}.json".format(F.case)))
+    updates = live.replay(argument, predictor, F.num_justices)
+else:
+    updates = stream_stdin()
+
+start_time = time.time()
+count = 0
+prob = predictor.predict({})
+for argument, prob in updates:
+    count += 1
+    if not F.quiet and count % F.every == 0:
+        write(count, prob)
+        sys.stdout.flush()
+if F.quiet or count % F.every:
+    write(count, prob)
+
+elapsed = time.time() - start_time
+print("{} utterances in {:.3f}s ({:.0f} per second)"
+        .format(count, elapsed, count / elapsed if elapsed else 0), file=sys.stderr)
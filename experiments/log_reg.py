@@ -15,15 +15,15 @@ class Model(object):
 
         # output layer
         with tf.name_scope("output"):
-            weights = tf.Variable(
+            self.weights = tf.Variable(
                     tf.truncated_normal([num_features, OUTPUT_SIZE], stddev=5),
                     name="weights_output"
                     )
-            biases = tf.Variable(
+            self.biases = tf.Variable(
                     tf.constant(0.5, shape=[OUTPUT_SIZE]),
                     name = "biases_output"
                     )
-            self.scores = tf.matmul(self.input, weights) + biases
+            self.scores = tf.matmul(self.input, self.weights) + self.biases
             self.probabilities = tf.nn.softmax(self.scores, name="probabilities")
             self.predictions = tf.argmax(self.probabilities, dimension=1, name="predictions")
 
@@ -36,7 +36,7 @@ class Model(object):
                 # + beta * tf.nn.l2_loss(biases))
 #             adj = 0.05 * (tf.slice(self.scores, [0,0], [-1,1]) 
 #                     - tf.slice(self.output, [0,0], [-1,1])) # penalize more for false negatives
-            self.loss = tf.reduce_mean(losses)
+            self.loss = tf.reduce_mean(losses) + beta * tf.nn.l2_loss(self.weights)
 
         # calculate accuracy of predicting wins
         with tf.name_scope("accuracy"):
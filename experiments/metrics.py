@@ -0,0 +1,44 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+def evaluate(predicted, actual):
+    """
+    Accuracy, precision, recall and positive rate of 0/1 predictions, as in
+    bayes.evaluate.  predicted may have extra trailing axes (one column per
+    model, say), in which case every metric is computed per column.
+    """
+    predicted = np.asarray(predicted)
+    actual = np.asarray(actual)
+    actual = actual.reshape(actual.shape + (1,) * (predicted.ndim - actual.ndim))
+
+    correct = predicted == actual
+    predicted_positive = predicted == 1
+    actual_positive = np.broadcast_to(actual == 1, predicted.shape)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        accuracy = np.mean(correct, axis=0)
+        precision = np.sum(correct & predicted_positive, axis=0) / np.sum(predicted_positive, axis=0)
+        recall = np.sum(correct & actual_positive, axis=0) / np.sum(actual_positive, axis=0)
+        positive_rate = np.mean(predicted_positive, axis=0)
+
+    return accuracy, precision, recall, positive_rate
+
+def evaluate_groups(predicted, actual, groups, num_groups):
+    """
+    The metrics of evaluate, computed separately for every group (a
+    cross-validation fold, say) in a single pass.  groups holds each case's
+    group, from 0 to num_groups - 1.
+    """
+    predicted = np.asarray(predicted)
+    actual = np.asarray(actual)
+    count = lambda mask: np.bincount(groups, weights=mask, minlength=num_groups)
+
+    correct = predicted == actual
+    with np.errstate(invalid="ignore", divide="ignore"):
+        accuracy = count(correct) / count(np.ones_like(correct))
+        precision = count(correct & (predicted == 1)) / count(predicted == 1)
+        recall = count(correct & (actual == 1)) / count(actual == 1)
+        positive_rate = count(predicted == 1) / count(np.ones_like(correct))
+
+    return accuracy, precision, recall, positive_rate
@@ -68,3 +68,16 @@ class Model(object):
             correct_predictions = tf.equal(self.predictions, tf.argmax(self.output, 1))
             self.accuracy = 100 * tf.reduce_mean(tf.cast(correct_predictions, "float"), name="value")
 
+def restored_tensors(graph):
+    '''
+    The input, dropout probability, predictions and probabilities tensors of
+    a Model restored from a checkpoint.  Older graphs call the outputs
+    win_predictions and win_probabilities.
+    '''
+    tensor = lambda name: graph.get_operation_by_name(name).outputs[0]
+    def output(name):
+        try:
+            return tensor("output/" + name)
+        except KeyError: # older graphs
+            return tensor("output/win_" + name)
+    return tensor("input/input_x"), tensor("dropout_probability"), output("predictions"), output("probabilities")
@@ -0,0 +1,88 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+import thresholds
+
+class Model(object):
+    """
+    Gaussian Naive Bayes classifier for Supreme Court predictions, the Python
+    counterpart of bayes.predict.  Column i of a feature matrix must hold the
+    feature named keys[i].
+    """
+    def __init__(self, keys, prior, mean_pet, var_pet, mean_resp, var_resp):
+        self.keys = list(keys)
+        self.prior = float(prior)
+        # row 0 is petitioner, row 1 respondent
+        self.means = np.array([mean_pet, mean_resp], dtype=np.float64)
+        self.variances = np.array([var_pet, var_resp], dtype=np.float64)
+
+        # log N(x; m, v) summed over features is
+        #   x^2 . (-1/2v) + x . (m/v) + sum(-m^2/2v - log(2 pi v)/2)
+        # so the likelihoods of a whole matrix are two matrix products
+        precision = 1 / self.variances
+        self.quadratic = (-0.5 * precision).T
+        self.linear = (self.means * precision).T
+        self.constant = (np.log([self.prior, 1 - self.prior])
+                + np.sum(-0.5 * self.means**2 * precision
+                    - 0.5 * np.log(2 * np.pi * self.variances), axis=1))
+
+    def log_joint(self, x):
+        """
+        Log of prior times likelihood, one column per class.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        return np.dot(x * x, self.quadratic) + np.dot(x, self.linear) + self.constant
+
+    def predict_proba(self, x):
+        """
+        Posterior probabilities, one row per case: [petitioner, respondent].
+        """
+        return normalize(self.log_joint(x))
+
+    def predict(self, x, num_justices=None):
+        """
+        1 if the petitioner is predicted to win, otherwise 0.
+        """
+        if num_justices is None and "j_num" in self.keys:
+            num_justices = np.asarray(x)[:, self.keys.index("j_num")]
+        return decide(self.predict_proba(x)[:, 0], num_justices)
+
+def normalize(log_joint):
+    log_evidence = np.logaddexp(log_joint[:, 0], log_joint[:, 1])
+    return np.exp(log_joint - log_evidence[:, None])
+
+def decide(prob, num_justices=None):
+    """
+    Turn petitioner win probabilities into 0/1 predictions.
+    """
+    predicted = (prob >= 0.5).astype(np.int64)
+    if num_justices is not None:
+        # close 8-justice cases => split court means affirm
+        flip = (np.abs(0.5 - prob) < 0.05) & (np.asarray(num_justices) == 8)
+        predicted[flip] = 0
+    return predicted
+
+def load_thresholds(filename):
+    """
+    Read a Model from a thresholds file written by stats.js or
+    thresholds.write_thresholds.
+    """
+    return from_thresholds(thresholds.read_thresholds(filename))
+
+def from_thresholds(rows):
+    """
+    Build a Model from rows in the thresholds.csv format.  The first row holds
+    the prior, the rest one feature each.
+    """
+    prior = float(rows[0]["likelihood"])
+    rows = rows[1:]
+    column = lambda key: [float(row[key]) for row in rows]
+    return Model(
+            keys = [row["key"] for row in rows],
+            prior = prior,
+            mean_pet = column("mean_pet"),
+            var_pet = column("var_pet"),
+            mean_resp = column("mean_resp"),
+            var_resp = column("var_resp"),
+        )
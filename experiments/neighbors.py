@@ -0,0 +1,50 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+# Keep each block's distance matrix (queries x points x features) to roughly
+# this many floats
+BLOCK_ELEMENTS = 1 << 22
+
+def nearest(points, queries=None, k=5, block_size=None):
+    """
+    Find the k nearest points to every query by L1 distance, closest first.
+
+    Returns an array of indices into points, one row per query.  If queries is
+    None, every point is queried against all the others (leave-one-out), and a
+    point is never its own neighbor.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    leave_one_out = queries is None
+    if leave_one_out:
+        queries = points
+    queries = np.asarray(queries, dtype=np.float32)
+
+    num_points, num_features = points.shape
+    k = min(k, num_points - 1 if leave_one_out else num_points)
+    if block_size is None:
+        block_size = max(1, BLOCK_ELEMENTS // max(1, num_points * num_features))
+
+    indices = np.empty([len(queries), k], dtype=np.int64)
+    for start in range(0, len(queries), block_size):
+        block = queries[start : start + block_size]
+        distances = l1_distances(block, points)
+        rows = np.arange(len(block))
+        if leave_one_out:
+            distances[rows, start + rows] = np.inf
+
+        # unordered top k, then sort just those k
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.argsort(distances[rows[:, None], top], axis=1, kind="stable")
+        indices[start : start + len(block)] = top[rows[:, None], order]
+
+    return indices
+
+def l1_distances(queries, points):
+    return np.abs(queries[:, None, :] - points[None, :, :]).sum(axis=2)
+
+def predict(labels, neighbors):
+    """
+    Majority vote of each query's neighbors, for 0/1 labels.
+    """
+    return np.round(np.mean(labels[neighbors], axis=1)).astype(np.int64)
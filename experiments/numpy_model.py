@@ -0,0 +1,47 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+class Model(object):
+    """
+    NumPy-only forward pass of model.Model, using weights written by
+    export_model.py.  Dropout is off, as when predicting.
+    """
+    def __init__(self, weights, biases, weights_output, biases_output):
+        self.weights = weights
+        self.biases = biases
+        self.weights_output = weights_output
+        self.biases_output = biases_output
+
+    def scores(self, x):
+        layer = np.asarray(x, dtype=np.float32)
+        for weights, biases in zip(self.weights, self.biases):
+            layer = np.maximum(np.dot(layer, weights) + biases, 0) # ReLU
+        return np.dot(layer, self.weights_output) + self.biases_output
+
+    def probabilities(self, x):
+        scores = self.scores(x)
+        scores = scores - np.max(scores, axis=1, keepdims=True) # softmax, stably
+        exp = np.exp(scores)
+        return exp / np.sum(exp, axis=1, keepdims=True)
+
+    def predictions(self, x):
+        return np.argmax(self.scores(x), axis=1)
+
+    def save(self, filename):
+        arrays = {"weights_output": self.weights_output, "biases_output": self.biases_output}
+        for layer, (weights, biases) in enumerate(zip(self.weights, self.biases), 1):
+            arrays["weights_%d" % layer] = weights
+            arrays["biases_%d" % layer] = biases
+        with open(filename, "wb") as f:
+            np.savez(f, **arrays)
+
+def load(filename):
+    with np.load(filename) as arrays:
+        num_layers = sum(1 for key in arrays.files if key.startswith("weights_")) - 1
+        return Model(
+                weights = [arrays["weights_%d" % layer] for layer in range(1, num_layers + 1)],
+                biases = [arrays["biases_%d" % layer] for layer in range(1, num_layers + 1)],
+                weights_output = arrays["weights_output"],
+                biases_output = arrays["biases_output"],
+            )
@@ -0,0 +1,102 @@
+from __future__ import absolute_import, division, print_function
+
+import csv
+import io
+import os
+import numpy as np
+
+# The SCDB outcomes (data/outcomes.csv) that util.prepData joins onto the
+# features, reduced to the columns the models use and indexed by docket.
+# The first load of a CSV saves the reduced table next to it, so later
+# loads don't parse the whole database again until it changes.
+
+# Feature name and SCDB column, in the order prepData adds them
+SCHEMA = [
+    ("lower_dir", "lcDispositionDirection"),
+    ("issue", "issueArea"),
+    ("natural_court", "naturalCourt"),
+    ("p_type", "petitioner"),
+    ("r_type", "respondent"),
+]
+NAMES = [name for name, _ in SCHEMA]
+
+CACHE_VERSION = 1
+
+class Outcomes(object):
+    """
+    One row per docket, the first one in the file as with outcomes.find in
+    JS: dockets, and a float64 array for every name in SCHEMA.
+    """
+    def __init__(self, dockets, columns):
+        self.dockets = dockets
+        self.columns = columns
+        self.index = dict((docket, row) for row, docket in enumerate(dockets))
+
+    def __len__(self):
+        return len(self.dockets)
+
+    def rows(self, dockets):
+        """
+        The row of each docket, or -1 for dockets not in the table.
+        """
+        return np.array([self.index.get(docket, -1) for docket in dockets], dtype=np.int64)
+
+    def join(self, dockets, names=NAMES):
+        """
+        The outcome columns for a list of dockets.  Returns the indices of
+        the dockets that were found, and each named column for those.
+        """
+        rows = self.rows(dockets)
+        found = np.flatnonzero(rows >= 0)
+        return found, dict((name, self.columns[name][rows[found]]) for name in names)
+
+def number(value):
+    # like +value in JS: blank is 0, anything else unparseable is NaN
+    value = value.strip()
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def load(filename):
+    cache_file = filename + ".npz"
+    stat = os.stat(filename)
+    try:
+        with np.load(cache_file) as cache:
+            if (int(cache["version"]) == CACHE_VERSION and float(cache["mtime"]) == stat.st_mtime
+                    and int(cache["size"]) == stat.st_size):
+                return Outcomes(list(cache["dockets"]), dict((name, cache[name]) for name in NAMES))
+    except (IOError, KeyError, ValueError):
+        pass
+
+    outcomes = read_csv(filename)
+    np.savez(cache_file + ".tmp.npz", version=CACHE_VERSION, mtime=stat.st_mtime, size=stat.st_size,
+            dockets=np.array(outcomes.dockets, dtype=np.str_), **outcomes.columns)
+    os.rename(cache_file + ".tmp.npz", cache_file)
+    return outcomes
+
+def read_csv(filename):
+    """
+    Read the SCHEMA columns of an SCDB CSV, keeping the first row for each
+    docket.
+    """
+    # SCDB files aren't valid UTF-8; replace bad bytes as node does
+    with io.open(filename, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(key) for key in ["docket"] + [key for _, key in SCHEMA]]
+        seen = set()
+        dockets = []
+        values = []
+        for row in reader:
+            docket = row[positions[0]]
+            if docket in seen:
+                continue
+            seen.add(docket)
+            dockets.append(docket)
+            values.append([number(row[i]) for i in positions[1:]])
+
+    values = np.array(values, dtype=np.float64).reshape(-1, len(SCHEMA))
+    return Outcomes(dockets, dict((name, values[:, i].copy()) for i, name in enumerate(NAMES)))
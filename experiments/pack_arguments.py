@@ -0,0 +1,30 @@
+import argparse
+import time
+
+import packed_corpus
+
+# Pack arguments/ into the memory-mapped container that predict.py and
+# train.py --pack_dir read, or with --unpack write the JSON files back out.
+
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("--arguments_dir", default="arguments/",
+            help="Directory of parsed argument JSON files")
+parser.add_argument("--pack_dir", default="arguments.pack/",
+            help="Directory of the packed corpus (default: 'arguments.pack/')")
+parser.add_argument("--unpack", action="store_true",
+            help="Write pack_dir back out to arguments_dir instead (default: false)")
+parser.add_argument("--cases", default="",
+            help="Comma-separated cases to unpack (default: all of them)")
+F = parser.parse_args()
+
+start_time = time.time()
+if F.unpack:
+    cases = [case.strip() for case in F.cases.split(",") if case.strip()] or None
+    count = packed_corpus.unpack(F.pack_dir, F.arguments_dir, cases)
+    print("Wrote {} argument files to {} in {:.3f}s."
+            .format(count, F.arguments_dir, time.time() - start_time))
+else:
+    num_cases, num_utterances = packed_corpus.pack(F.arguments_dir, F.pack_dir)
+    print("Packed {} cases and {} utterances into {} in {:.3f}s."
+            .format(num_cases, num_utterances, F.pack_dir, time.time() - start_time))
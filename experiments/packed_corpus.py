@@ -0,0 +1,272 @@
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import io
+import json
+import os
+import shutil
+from collections import OrderedDict
+import numpy as np
+
+import processor
+
+# The argument JSON files packed into one memory-mapped container.  All the
+# utterance texts are one UTF-8 blob, located by byte offsets; speaker names
+# and sides are interned in a string table, and the people of every case in
+# a table of distinct people.  The rest of each file (parties, outcome, side
+# summaries) is small and irregular, so it stays JSON, one header per case,
+# parsed only when that case is asked for.  unpack writes the JSON files
+# back byte for byte.
+
+PACK_VERSION = 1
+INDEX_FILE = "index.json"
+TEXT_FILE = "text.bin"
+HEADERS_FILE = "headers.bin"
+ARRAYS = ["case_offsets", "text_offsets", "names", "ids", "spoke_before", "side_before",
+        "case_people", "people_offsets", "header_offsets"]
+
+# every speaker has these keys, in this order, in files from parser.js
+SPEAKER_KEYS = ["name", "id", "spokeBefore", "sideBefore", "text"]
+NO_STRING = -1 # a null name or side
+NO_NUMBER = np.iinfo(np.int32).min # a null id or spokeBefore
+
+class PackedCorpus(object):
+    """
+    An opened pack.  Case i (named cases[i], the file name without .json)
+    holds utterances case_offsets[i] up to case_offsets[i+1], and utterance
+    j's text is text[text_offsets[j]:text_offsets[j+1]].
+    """
+    def __init__(self, pack_dir):
+        with io.open(os.path.join(pack_dir, INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f, object_pairs_hook=OrderedDict)
+        if index.get("version") != PACK_VERSION:
+            raise ValueError("{} is not a version {} pack".format(pack_dir, PACK_VERSION))
+        self.cases = index["cases"]
+        self.strings = index["strings"]
+        self.person_table = index["people"]
+        self.case_ids = dict((case, i) for i, case in enumerate(self.cases))
+
+        for key in ARRAYS:
+            setattr(self, key, np.load(os.path.join(pack_dir, key + ".npy"), mmap_mode="r"))
+        self.text = map_bytes(os.path.join(pack_dir, TEXT_FILE))
+        self.headers = map_bytes(os.path.join(pack_dir, HEADERS_FILE))
+
+    def __len__(self):
+        return len(self.cases)
+
+    def __contains__(self, case):
+        return case in self.case_ids
+
+    def string(self, i):
+        return self.strings[i] if i != NO_STRING else None
+
+    def utterance_range(self, case):
+        i = self.case_ids[case]
+        return int(self.case_offsets[i]), int(self.case_offsets[i + 1])
+
+    def texts(self, start, stop):
+        """
+        The texts of utterances start up to stop, from a single read of the
+        blob.
+        """
+        offsets = (self.text_offsets[start : stop + 1] - self.text_offsets[start]).tolist()
+        blob = self.text[self.text_offsets[start] : self.text_offsets[stop]].tobytes()
+        return [blob[offsets[j] : offsets[j + 1]].decode("utf-8") for j in range(stop - start)]
+
+    def speakers(self, case, start=0, stop=None):
+        """
+        processor.Speakers for the case's utterances start up to stop,
+        counted from the start of the case.  stop is clamped to the end of
+        the case, but start must be within it.
+        """
+        first, last = self.utterance_range(case)
+        stop = last - first if stop is None else min(stop, last - first)
+        if not 0 <= start <= stop:
+            raise IndexError("Utterances {} to {} aren't in {}, which has {}"
+                    .format(start, stop, case, last - first))
+        first, last = first + start, first + stop
+        return [processor.Speaker(number(id), self.string(side), text) for id, side, text in
+                zip(self.ids[first:last].tolist(), self.side_before[first:last].tolist(), self.texts(first, last))]
+
+    def header(self, case):
+        i = self.case_ids[case]
+        blob = self.headers[self.header_offsets[i] : self.header_offsets[i + 1]].tobytes()
+        return json.loads(blob.decode("utf-8"), object_pairs_hook=OrderedDict)
+
+    def people(self, case):
+        i = self.case_ids[case]
+        return [self.person_table[p] for p in self.case_people[self.people_offsets[i] : self.people_offsets[i + 1]].tolist()]
+
+    def argument(self, case, speakers=True):
+        """
+        The case as a processor.Argument, as processor.load_argument would
+        read it from the JSON file.  Without speakers, the transcript isn't
+        read at all and argument.speakers is empty.
+        """
+        header = self.header(case)
+        header.pop("speakers", None)
+        header["people"] = self.people(case)
+        argument = processor.Argument(header)
+        if speakers:
+            argument.speakers = self.speakers(case)
+        return argument
+
+    def arguments(self, max_count=-1):
+        """
+        Every case as a processor.Argument, in the same order as
+        processor.stream_arguments.
+        """
+        cases = self.cases if max_count < 0 else self.cases[:max_count]
+        for case in cases:
+            yield self.argument(case)
+
+    def fingerprint(self, case):
+        """
+        A digest of everything the pack holds for the case, which changes
+        when its file did.
+        """
+        i = self.case_ids[case]
+        first, last = self.utterance_range(case)
+        digest = hashlib.sha1()
+        digest.update(self.headers[self.header_offsets[i] : self.header_offsets[i + 1]].tobytes())
+        digest.update(json.dumps(self.people(case), sort_keys=True).encode("utf-8"))
+        for array in [self.names, self.ids, self.spoke_before, self.side_before]:
+            digest.update(array[first:last].tobytes())
+        # string ids differ between packs, so the strings themselves count too
+        used = np.unique(np.concatenate([self.names[first:last], self.side_before[first:last]]))
+        digest.update(json.dumps([[int(i), self.string(i)] for i in used]).encode("utf-8"))
+        digest.update(self.text[self.text_offsets[first] : self.text_offsets[last]].tobytes())
+        return digest.hexdigest()
+
+    def document(self, case):
+        """
+        The case's full JSON document, keys in their original order.
+        """
+        document = self.header(case)
+        if "people" in document:
+            document["people"] = self.people(case)
+        if "speakers" in document:
+            first, last = self.utterance_range(case)
+            document["speakers"] = [OrderedDict(zip(SPEAKER_KEYS, [self.string(name), number(id),
+                    number(spoke_before), self.string(side), text])) for name, id, spoke_before, side, text in
+                    zip(self.names[first:last].tolist(), self.ids[first:last].tolist(),
+                        self.spoke_before[first:last].tolist(), self.side_before[first:last].tolist(),
+                        self.texts(first, last))]
+        return document
+
+def number(n):
+    return int(n) if n != NO_NUMBER else None
+
+def map_bytes(filename):
+    if os.path.getsize(filename) == 0:
+        return np.zeros(0, dtype=np.uint8) # can't memory-map an empty file
+    return np.memmap(filename, dtype=np.uint8, mode="r")
+
+def load(pack_dir):
+    return PackedCorpus(pack_dir)
+
+def pack(arguments_dir, pack_dir):
+    """
+    Pack every JSON file in arguments_dir into pack_dir, replacing what was
+    there.  Returns the numbers of cases and utterances.
+    """
+    strings = []
+    string_ids = {}
+    def intern(value, what):
+        if value is None:
+            return NO_STRING
+        if not isinstance(value, type(u"")):
+            raise ValueError("Can't pack a {} of {!r}".format(what, value))
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    def check_number(value, what):
+        if value is None:
+            return NO_NUMBER
+        if isinstance(value, bool) or not isinstance(value, int) or not NO_NUMBER < value <= np.iinfo(np.int32).max:
+            raise ValueError("Can't pack a {} of {!r}".format(what, value))
+        return value
+
+    person_table = []
+    person_ids = {}
+    cases = []
+    columns = dict((key, []) for key in ["names", "ids", "spoke_before", "side_before", "case_people"])
+    case_offsets = [0]
+    text_offsets = [0]
+    people_offsets = [0]
+    header_offsets = [0]
+
+    temp_dir = pack_dir.rstrip("/\\") + ".tmp"
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+    with open(os.path.join(temp_dir, TEXT_FILE), "wb") as text_file, \
+            open(os.path.join(temp_dir, HEADERS_FILE), "wb") as headers_file:
+        for filename in processor.argument_files(arguments_dir):
+            with io.open(filename, encoding="utf-8") as f:
+                document = json.load(f, object_pairs_hook=OrderedDict)
+            cases.append(os.path.basename(filename)[:-len(".json")])
+
+            for speaker in document.get("speakers", []):
+                if list(speaker.keys()) != SPEAKER_KEYS:
+                    raise ValueError("{}: can't pack a speaker with keys {}".format(filename, list(speaker.keys())))
+                columns["names"].append(intern(speaker["name"], "name"))
+                columns["ids"].append(check_number(speaker["id"], "speaker id"))
+                columns["spoke_before"].append(check_number(speaker["spokeBefore"], "spokeBefore"))
+                columns["side_before"].append(intern(speaker["sideBefore"], "sideBefore"))
+                if not isinstance(speaker["text"], type(u"")):
+                    raise ValueError("{}: can't pack a text of {!r}".format(filename, speaker["text"]))
+                text = speaker["text"].encode("utf-8")
+                text_file.write(text)
+                text_offsets.append(text_offsets[-1] + len(text))
+            case_offsets.append(len(columns["names"]))
+
+            for person in document.get("people", []):
+                key = json.dumps(person, ensure_ascii=False, separators=(",", ":"))
+                if key not in person_ids:
+                    person_ids[key] = len(person_table)
+                    person_table.append(person)
+                columns["case_people"].append(person_ids[key])
+            people_offsets.append(len(columns["case_people"]))
+
+            # the speakers and people are filled back in where they were
+            for key in ["speakers", "people"]:
+                if key in document:
+                    document[key] = None
+            header = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            headers_file.write(header)
+            header_offsets.append(header_offsets[-1] + len(header))
+
+    arrays = dict((key, np.array(values, dtype=np.int32)) for key, values in columns.items())
+    arrays["case_offsets"] = np.array(case_offsets, dtype=np.int64)
+    arrays["text_offsets"] = np.array(text_offsets, dtype=np.int64)
+    arrays["people_offsets"] = np.array(people_offsets, dtype=np.int64)
+    arrays["header_offsets"] = np.array(header_offsets, dtype=np.int64)
+    for key in ARRAYS:
+        np.save(os.path.join(temp_dir, key + ".npy"), arrays[key])
+    with io.open(os.path.join(temp_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": PACK_VERSION, "cases": cases, "strings": strings,
+                "people": person_table}, ensure_ascii=False))
+
+    if os.path.exists(pack_dir):
+        shutil.rmtree(pack_dir)
+    os.rename(temp_dir, pack_dir)
+    return len(cases), len(columns["names"])
+
+def unpack(pack_dir, arguments_dir, cases=None):
+    """
+    Write the given cases (default: all of them) of a pack back out as JSON
+    files in arguments_dir, as parser.js writes them.  Returns the number
+    of files written.
+    """
+    corpus = load(pack_dir)
+    cases = corpus.cases if cases is None else cases
+    if not os.path.exists(arguments_dir):
+        os.makedirs(arguments_dir)
+    for case in cases:
+        document = json.dumps(corpus.document(case), ensure_ascii=False, separators=(",", ":"))
+        with io.open(os.path.join(arguments_dir, case + ".json"), "w", encoding="utf-8") as f:
+            f.write(document)
+    return len(cases)
@@ -1,57 +1,83 @@
 import tensorflow as tf
 import numpy as np
+import fnmatch
+import glob
 import os
 import shutil
-import json
-from dotmap import DotMap
 import time
 
 import processor
-from model import Model
+import packed_corpus
+import predictions as predictions_file
+from model import restored_tensors
 
 # Command-line parameters
 tf.flags.DEFINE_boolean("predict_margin", False, "Predict win margin instead of winning side (default: false)")
-tf.flags.DEFINE_integer("num_justices", 9, "Number of justices on the court (default: 9)")
+tf.flags.DEFINE_integer("num_justices", 9, "Number of justices on the court, for arguments that don't say (default: 9)")
 tf.flags.DEFINE_string("case", "", "Case to predict")
 tf.flags.DEFINE_string("dir", "", "Directory to read network from")
 tf.flags.DEFINE_string("arguments_dir", "arguments/", "Directory to read parsed arguments from")
+tf.flags.DEFINE_string("pack_dir", "", "Packed corpus from pack_arguments.py to read cases from instead (default: none)")
+tf.flags.DEFINE_string("cases", "", "Comma-separated cases or patterns like '15-*' to predict in bulk ('*' for all)")
+tf.flags.DEFINE_string("out_file", "", "File to write bulk predictions to (default: 'predictions.csv' in dir)")
+tf.flags.DEFINE_integer("num_workers", 0, "Processes to read arguments with in bulk mode (default: one per CPU)")
 
 F = tf.flags.FLAGS
 F._parse_flags()
 
+checkpoint_file = tf.train.latest_checkpoint(F.dir)
+# data/predictions.csv holds mass_predict.js's Naive Bayes predictions
+out_file = F.out_file or os.path.join(F.dir, "predictions.csv")
+
 # Get data
-print("Loading case...") 
-filename = os.path.join(os.getcwd(), F.arguments_dir, "{}.json".format(F.case))
-with open(filename) as case_file:
-    argument = DotMap( json.load(case_file) )
-    pet = argument.side_summaries[0]
-    resp = argument.side_summaries[1]
-    jus = argument.side_summaries[2]
-    print(pet)
-    p_words = float(pet.words_spoken)
-    r_words = float(resp.words_spoken)
-    j_words = float(jus.words_spoken)
-    x = np.array([[
-            float(pet.interruptions) / p_words,
-            float(pet.times_spoken) / p_words,
-            float(pet.laughter) / p_words,
-            float(len(argument.petitioner.counsel)),
-            float(pet.num_int_by),
-            float(resp.interruptions) / r_words,
-            float(resp.times_spoken) / r_words,
-            float(resp.laughter) / r_words,
-            float(len(argument.respondent.counsel)),
-            float(resp.num_int_by),
-            float(jus.interruptions) / j_words,
-            float(jus.times_spoken) / j_words,
-            float(jus.laughter) / j_words,
-            float(F.num_justices),
-            float(jus.num_int_by),
-        ]])
-print("Case loaded.")
+corpus = packed_corpus.load(F.pack_dir) if F.pack_dir else None
+if F.cases:
+    print("Loading cases...")
+    cases = set()
+    for pattern in F.cases.split(","):
+        if corpus:
+            cases.update(fnmatch.filter(corpus.cases, pattern.strip()))
+        else:
+            filenames = glob.glob(os.path.join(F.arguments_dir, "{}.json".format(pattern.strip())))
+            cases.update(os.path.basename(filename)[:-len(".json")] for filename in filenames)
+    cases = sorted(cases)
+
+    # skip cases whose transcript and checkpoint haven't changed
+    manifest = predictions_file.read_manifest(out_file)
+    old_rows = predictions_file.read_predictions(out_file)
+    predicted_cases = set(row["caseNumber"] for row in old_rows)
+    stale = []
+    for case in cases:
+        if corpus:
+            key = [corpus.fingerprint(case), checkpoint_file]
+        else:
+            key = predictions_file.source_key(os.path.join(F.arguments_dir, case + ".json"), checkpoint_file)
+        if case in predicted_cases and manifest.get(case) == key:
+            continue
+        manifest[case] = key
+        stale.append(case)
+
+    if corpus: # the side summaries are all that's needed, so skip the transcripts
+        arguments = (corpus.argument(case, speakers=False) for case in stale)
+    else:
+        arguments = processor.parse_files([os.path.join(F.arguments_dir, case + ".json") for case in stale],
+                num_workers=F.num_workers)
+    arguments = list(arguments)
+    x = [processor.argument_features(argument, F.num_justices) for argument in arguments]
+    x = np.array(x).reshape(-1, 15)
+    print("{} cases loaded, {} unchanged.".format(len(stale), len(cases) - len(stale)))
+else:
+    print("Loading case...") 
+    if corpus:
+        argument = corpus.argument(F.case, speakers=False)
+    else:
+        filename = os.path.join(os.getcwd(), F.arguments_dir, "{}.json".format(F.case))
+        argument = processor.load_argument(filename)
+    print(argument.side_summaries[0])
+    x = np.array([processor.argument_features(argument, F.num_justices)])
+    print("Case loaded.")
 
 print("Initializing model...")
-checkpoint_file = tf.train.latest_checkpoint(F.dir)
 print("Reading checkpoint from {}".format(checkpoint_file))
 graph = tf.Graph()
 with graph.as_default():
@@ -61,21 +87,29 @@ with graph.as_default():
         saver.restore(session, checkpoint_file)
         
         # find input and output tensors 
-        input_x = graph.get_operation_by_name("input/input_x").outputs[0]
-        dropout_prob = graph.get_operation_by_name("dropout_probability").outputs[0]
-        predictions = graph.get_operation_by_name("output/win_predictions").outputs[0]
-        probabilities = graph.get_operation_by_name("output/win_probabilities").outputs[0]
+        input_x, dropout_prob, predictions, probabilities = restored_tensors(graph)
         print("Model initialized.\n")
 
         feed_data = {
                 input_x: x,
                 dropout_prob: 1.0,
                 }
+        start_time = time.time()
         predictions, probabilities = session.run([predictions, probabilities], feed_data)
+        elapsed = time.time() - start_time
 
-        print("=========")
-        print("Petitioner ({}): {:g}% chance"
-                .format(argument.petitioner.name, probabilities[0][0]*100))
-        print("Respondent ({}): {:g}% chance"
-                .format(argument.respondent.name, probabilities[0][1]*100))
-        print("=========")
+        if F.cases:
+            print("Predicted {} cases in {:.3f}s.".format(len(x), elapsed))
+            new_rows = [predictions_file.prediction_row(argument, probability[0])
+                    for argument, probability in zip(arguments, probabilities)]
+            # newest first, like mass_predict.js
+            predictions_file.write_predictions(out_file, new_rows + old_rows)
+            predictions_file.write_manifest(out_file, manifest)
+            print("Wrote predictions to {}".format(out_file))
+        else:
+            print("=========")
+            print("Petitioner ({}): {:g}% chance"
+                    .format(argument.petitioner["name"], probabilities[0][0]*100))
+            print("Respondent ({}): {:g}% chance"
+                    .format(argument.respondent["name"], probabilities[0][1]*100))
+            print("=========")
@@ -0,0 +1,44 @@
+import argparse
+import numpy as np
+import os
+import time
+
+import processor
+import numpy_model
+
+# predict.py without TensorFlow, for a model exported by export_model.py.
+
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("--num_justices", type=int, default=9,
+            help="Number of justices on the court, for arguments that don't say (default: 9)")
+parser.add_argument("--case", default="",
+            help="Case to predict")
+parser.add_argument("--model", default="",
+            help="Exported model to read (a model.npz from export_model.py)")
+parser.add_argument("--arguments_dir", default="arguments/",
+            help="Directory to read parsed arguments from")
+F = parser.parse_args()
+
+start_time = time.time()
+
+# Get data
+print("Loading case...")
+filename = os.path.join(os.getcwd(), F.arguments_dir, "{}.json".format(F.case))
+argument = processor.load_argument(filename)
+print(argument.side_summaries[0])
+x = np.array([processor.argument_features(argument, F.num_justices)])
+print("Case loaded.")
+
+print("Reading model from {}".format(F.model))
+model = numpy_model.load(F.model)
+probabilities = model.probabilities(x)
+elapsed = time.time() - start_time
+
+print("=========")
+print("Petitioner ({}): {:g}% chance"
+        .format(argument.petitioner["name"], probabilities[0][0]*100))
+print("Respondent ({}): {:g}% chance"
+        .format(argument.respondent["name"], probabilities[0][1]*100))
+print("=========")
+print("Predicted in {:.1f}ms.".format(elapsed * 1000))
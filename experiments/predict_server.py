@@ -0,0 +1,227 @@
+from __future__ import print_function
+
+import tensorflow as tf
+import numpy as np
+import json
+import os
+import socket
+import sys
+import threading
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import processor
+from model import restored_tensors
+
+# Long-lived version of predict.py.  Loads the latest checkpoint in --dir once
+# and answers prediction requests, one JSON object per line, either on stdin
+# (answers on stdout) or on a Unix socket.  A request looks like
+#   {"id": 1, "case": "03-101"}   or   {"id": 2, "argument": {...parsed JSON...}}
+# with an optional "num_justices".  Requests that arrive within --batch_window
+# of each other are answered with a single session.run.
+
+# Command-line parameters
+tf.flags.DEFINE_integer("num_justices", 9, "Default number of justices on the court (default: 9)")
+tf.flags.DEFINE_string("dir", "", "Directory to read network from")
+tf.flags.DEFINE_string("arguments_dir", "arguments/", "Directory to read parsed arguments from")
+tf.flags.DEFINE_string("socket", "", "Unix socket to listen on (default: read stdin)")
+tf.flags.DEFINE_integer("max_batch", 64, "Most requests to answer with one session.run (default: 64)")
+tf.flags.DEFINE_float("batch_window", 0.005, "Seconds to wait for more requests to batch (default: 0.005)")
+tf.flags.DEFINE_float("reload_every", 5.0, "Seconds between checks for a newer checkpoint (default: 5)")
+
+F = tf.flags.FLAGS
+F._parse_flags()
+
+def log(message):
+    # stdout carries the responses in stdin mode
+    print(message, file=sys.stderr)
+
+class Predictor(object):
+    """
+    A restored checkpoint and the session it lives in.
+    """
+    def __init__(self, checkpoint_file):
+        self.checkpoint_file = checkpoint_file
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.session = tf.Session()
+            saver = tf.train.import_meta_graph("{}.meta".format(checkpoint_file))
+            saver.restore(self.session, checkpoint_file)
+
+            self.input_x, self.dropout_prob, _, self.probabilities = restored_tensors(self.graph)
+
+    def predict(self, x):
+        feed_data = {
+                self.input_x: x,
+                self.dropout_prob: 1.0,
+                }
+        return self.session.run(self.probabilities, feed_data)
+
+    def close(self):
+        self.session.close()
+
+class Request(object):
+    __slots__ = ["data", "reply", "received"]
+
+    def __init__(self, data, reply):
+        self.data = data
+        self.reply = reply
+        self.received = time.time()
+
+def features(data):
+    if "argument" in data:
+        argument = processor.Argument(data["argument"])
+    else:
+        filename = os.path.join(F.arguments_dir, "{}.json".format(data["case"]))
+        argument = processor.load_argument(filename)
+    if data.get("num_justices"):
+        return argument, processor.summary_features(argument, data["num_justices"])
+    return argument, processor.argument_features(argument, F.num_justices)
+
+def read_requests(lines, reply, requests):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            reply({"error": "Invalid JSON: {}".format(e)})
+            continue
+        if not isinstance(data, dict):
+            reply({"error": "Request must be a JSON object"})
+            continue
+        requests.put(Request(data, reply))
+
+def line_writer(stream):
+    lock = threading.Lock()
+    def reply(response):
+        with lock:
+            try:
+                stream.write(json.dumps(response) + "\n")
+                stream.flush()
+            except (IOError, OSError, ValueError):
+                pass # the client went away
+    return reply
+
+def serve_stdin(requests):
+    read_requests(sys.stdin, line_writer(sys.stdout), requests)
+    requests.put(None) # end of input
+
+def serve_socket(requests):
+    if os.path.exists(F.socket):
+        os.remove(F.socket)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(F.socket)
+    server.listen(16)
+    log("Listening on {}".format(F.socket))
+    while True:
+        connection, _ = server.accept()
+        stream = connection.makefile("rw")
+        handler = threading.Thread(target=read_requests,
+                args=(stream, line_writer(stream), requests))
+        handler.daemon = True
+        handler.start()
+
+def next_batch(requests, timeout):
+    try:
+        first = requests.get(timeout=timeout)
+    except queue.Empty:
+        return []
+    if first is None:
+        return None
+
+    batch = [first]
+    deadline = time.time() + F.batch_window
+    while len(batch) < F.max_batch:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            request = requests.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if request is None:
+            requests.put(None) # finish this batch first
+            break
+        batch.append(request)
+    return batch
+
+def answer(predictor, batch):
+    valid = []
+    x = []
+    for request in batch:
+        try:
+            argument, x_row = features(request.data)
+        except Exception as e:
+            request.reply({"id": request.data.get("id"), "error": str(e)})
+            continue
+        valid.append((request, argument))
+        x.append(x_row)
+    if not valid:
+        return
+
+    try:
+        probabilities = predictor.predict(np.array(x))
+    except Exception as e:
+        for request, _ in valid:
+            request.reply({"id": request.data.get("id"), "error": "Prediction failed: {}".format(e)})
+        return
+    done = time.time()
+    for (request, argument), probability in zip(valid, probabilities):
+        request.reply({
+            "id": request.data.get("id"),
+            "case": argument.case_number,
+            "petitioner": float(probability[0]),
+            "respondent": float(probability[1]),
+            "batch_size": len(valid),
+            "latency_ms": 1000 * (done - request.received),
+        })
+
+
+log("Initializing model...")
+checkpoint_file = tf.train.latest_checkpoint(F.dir)
+if checkpoint_file is None:
+    log("No checkpoint found in '{}'".format(F.dir))
+    sys.exit(1)
+log("Reading checkpoint from {}".format(checkpoint_file))
+predictor = Predictor(checkpoint_file)
+log("Model initialized.")
+
+requests = queue.Queue()
+reader = threading.Thread(target=serve_socket if F.socket else serve_stdin, args=(requests,))
+reader.daemon = True
+reader.start()
+
+last_check = time.time()
+try:
+    while True:
+        batch = next_batch(requests, F.reload_every)
+        if batch is None:
+            break
+        if batch:
+            answer(predictor, batch)
+
+        # hot-reload when training writes a newer checkpoint
+        if time.time() - last_check >= F.reload_every:
+            last_check = time.time()
+            latest = tf.train.latest_checkpoint(F.dir)
+            if latest and latest != predictor.checkpoint_file:
+                log("Reloading checkpoint from {}".format(latest))
+                try:
+                    new_predictor = Predictor(latest)
+                except Exception as e:
+                    log("Couldn't reload, keeping {}: {}".format(predictor.checkpoint_file, e))
+                    continue
+                old = predictor
+                predictor = new_predictor
+                old.close()
+except KeyboardInterrupt:
+    pass
+finally:
+    predictor.close()
+    if F.socket and os.path.exists(F.socket):
+        os.remove(F.socket)
@@ -0,0 +1,71 @@
+from __future__ import absolute_import, division, print_function
+
+import csv
+import io
+import json
+import os
+
+# Reading and writing files in the format of data/predictions.csv, plus a
+# manifest of what each prediction was made from, so unchanged cases can be
+# skipped.
+
+COLUMNS = ["caseNumber", "date", "petitioner", "respondent", "prob", "correct"]
+
+def prediction_row(argument, prob):
+    """
+    A predictions.csv row for argument, given the petitioner's chance of
+    winning, as mass_predict.js writes it.
+    """
+    prediction = 1 if prob >= 0.5 else 0
+    if argument.outcome:
+        side = 1 if argument.outcome["side"] == "petitioner" else 0
+        correct = 1 - abs(side - prediction)
+    else:
+        correct = -1
+    return {
+        "caseNumber": argument.case_number,
+        "date": argument.date,
+        "petitioner": argument.petitioner["name"].replace("\n", " ").strip(),
+        "respondent": argument.respondent["name"].replace("\n", " ").strip(),
+        "prob": repr(float(prob)),
+        "correct": correct,
+    }
+
+def read_predictions(filename):
+    if not os.path.exists(filename):
+        return []
+    with io.open(filename, newline="", encoding="utf-8") as p_csv:
+        return list(csv.DictReader(p_csv))
+
+def write_predictions(filename, rows):
+    """
+    Write rows one at a time, keeping only the first row for every case.
+    """
+    seen = set()
+    with io.open(filename, "w", newline="", encoding="utf-8") as p_csv:
+        writer = csv.DictWriter(p_csv, COLUMNS, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            if row["caseNumber"] in seen:
+                continue
+            seen.add(row["caseNumber"])
+            writer.writerow(row)
+
+def manifest_file(filename):
+    return filename + ".manifest.json"
+
+def read_manifest(filename):
+    try:
+        with open(manifest_file(filename)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def write_manifest(filename, manifest):
+    with open(manifest_file(filename), "w") as f:
+        json.dump(manifest, f)
+
+def source_key(argument_file, checkpoint_file):
+    # what a prediction depends on: the transcript and the model
+    stat = os.stat(argument_file)
+    return [stat.st_mtime, stat.st_size, checkpoint_file]
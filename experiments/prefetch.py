@@ -0,0 +1,77 @@
+from __future__ import absolute_import, division, print_function
+
+import sys
+import threading
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+class Prefetcher(object):
+    """
+    Run prepare on every item of items (batches, say) in background
+    threads, keeping up to capacity prepared items ready, and iterate over
+    the results in their original order.  wait_time is how long iteration
+    has spent blocked on the threads.
+    """
+    def __init__(self, items, prepare, capacity=8, num_threads=1):
+        self.items = iter(items)
+        self.prepare = prepare
+        self.num_threads = num_threads
+        self.wait_time = 0.0
+        self.count = 0
+
+        self.prepared = queue.Queue(capacity)
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self.threads = []
+        for _ in range(num_threads):
+            thread = threading.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def work(self):
+        while True:
+            with self.lock:
+                try:
+                    item = next(self.items)
+                except StopIteration:
+                    self.prepared.put((None, None, None))
+                    return
+                except Exception:
+                    self.prepared.put((None, None, sys.exc_info()))
+                    return
+                index = self.next_index
+                self.next_index += 1
+            try:
+                self.prepared.put((index, self.prepare(item), None))
+            except Exception:
+                self.prepared.put((None, None, sys.exc_info()))
+                return
+
+    def __iter__(self):
+        waiting = {} # prepared out of order
+        finished = 0
+        while True:
+            if self.count in waiting:
+                yield waiting.pop(self.count)
+                self.count += 1
+                continue
+            if finished == self.num_threads:
+                break
+
+            start_time = time.time()
+            index, result, error = self.prepared.get()
+            self.wait_time += time.time() - start_time
+            if error:
+                raise error[1]
+            if index is None:
+                finished += 1
+            else:
+                waiting[index] = result
+
+    def report(self, elapsed):
+        return "Waited {:.3f}s for data over {} batches ({:.1%} of {:.3f}s)".format(
+                self.wait_time, self.count, self.wait_time / elapsed if elapsed else 0, elapsed)
@@ -2,81 +2,217 @@ from __future__ import absolute_import, division, print_function
 
 import glob
 import json
-import re
+import multiprocessing
+import os
+from collections import deque, namedtuple
 import numpy as np
-from dotmap import DotMap
 
-def load_data(max_count):
-    data = load_raw_data(max_count)
+import tokenizer
+
+ARGUMENTS_DIR = "../arguments"
+
+Speaker = namedtuple("Speaker", ["id", "side_before", "text"])
+
+class Argument(object):
+    """
+    The parts of a parsed argument JSON file that the models use.
+    """
+    __slots__ = ["case_number", "date", "petitioner", "respondent", "outcome",
+            "num_justices", "people", "speakers", "side_summaries"]
+
+    def __init__(self, data):
+        self.case_number = data.get("caseNumber")
+        self.date = data.get("date")
+        self.petitioner = data.get("petitioner")
+        self.respondent = data.get("respondent")
+        self.outcome = data.get("outcome")
+        # parser.js writes this misspelled, as "num_jusitces"
+        self.num_justices = data.get("num_justices", data.get("num_jusitces"))
+        self.people = data.get("people", [])
+        self.speakers = [Speaker(s.get("id"), s.get("sideBefore"), s.get("text", ""))
+                for s in data.get("speakers", [])]
+        self.side_summaries = data.get("side_summaries")
+
+def load_data(max_count, arguments=None):
+    # arguments can come from elsewhere, like packed_corpus, instead of the files
     inputs_text = []
     inputs_extra = []
     outputs = []
-    for argument in data:
-        text = get_text(argument)
-        for speaker in text:
-            if not "sideBefore" in speaker: continue
-            if speaker.sideBefore == "petitioner":
-                id_vec = [1, 0, 0]
-            elif speaker.sideBefore == "respondent":
-                id_vec = [0, 1, 0]
-            else:
-                id_vec = [0, 0, 1]
-            inputs_text.append(speaker.text)
+    for argument in arguments if arguments is not None else stream_arguments(max_count):
+        for text, id_vec, output in utterances(argument):
+            inputs_text.append(text)
             inputs_extra.append(id_vec)
-            petitioner_output = 1 if argument.outcome.side == "petitioner" else 0
-            respondent_output = 1 if argument.outcome.side == "respondent" else 0
-            outputs.append([petitioner_output, respondent_output])
+            outputs.append(output)
 
     return [inputs_text, inputs_extra, outputs]
 
+def utterances(argument):
+    output = outcome_vector(argument)
+    for speaker, text in zip(argument.speakers, get_text(argument)):
+        if speaker.side_before is None: continue
+        yield text, side_vector(speaker.side_before), output
+
+def side_vector(side):
+    if side == "petitioner":
+        return [1, 0, 0]
+    elif side == "respondent":
+        return [0, 1, 0]
+    else:
+        return [0, 0, 1]
+
+def outcome_vector(argument):
+    side = argument.outcome["side"] if argument.outcome else None
+    petitioner_output = 1 if side == "petitioner" else 0
+    respondent_output = 1 if side == "respondent" else 0
+    return [petitioner_output, respondent_output]
+
 def load_raw_data(max_count):
-    data = []
+    return list(stream_arguments(max_count))
+
+def stream_arguments(max_count=-1, arguments_dir=ARGUMENTS_DIR, **kwargs):
+    """
+    Yield every argument in arguments_dir, in filename order.
+    """
+    filenames = argument_files(arguments_dir)
+    if max_count >= 0:
+        filenames = filenames[:max_count]
+    return parse_files(filenames, **kwargs)
+
+def parse_files(filenames, num_workers=None, max_in_flight=None):
+    """
+    Parse argument files in a pool of worker processes, yielding them in the
+    same order as filenames.  At most max_in_flight files are being parsed or
+    waiting to be consumed at once, so memory use doesn't grow with the number
+    of files.
+    """
+    num_workers = num_workers or multiprocessing.cpu_count()
+    if num_workers <= 1 or len(filenames) <= 1:
+        for filename in filenames:
+            yield load_argument(filename)
+        return
 
-    count = 0
-    for filename in glob.glob("../arguments/*.json"):
-        with open(filename) as data_file:
-            argument = DotMap( json.load(data_file) )
-            data.append(argument)
+    max_in_flight = max_in_flight or 2 * num_workers
+    pool = multiprocessing.Pool(num_workers)
+    pending = deque()
+    try:
+        for filename in filenames:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(load_argument, (filename,)))
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
 
-        count += 1
-        if max_count >= 0 and count > max_count:
-            break
+def argument_files(arguments_dir=ARGUMENTS_DIR):
+    return sorted(glob.glob(os.path.join(arguments_dir, "*.json")))
 
-    return data
+def load_argument(filename):
+    with open(filename) as data_file:
+        return Argument( json.load(data_file) )
 
 def get_text(argument):
-    for speaker in argument.speakers:
-        text = speaker.text
-        text = re.sub(r"[^A-Za-z0-9(),!?\'\`]", " ", text) # non alphanumeric or puncutation symbols removed
-        text = re.sub(r"\'s", " \'s", text) # sufixes
-        text = re.sub(r"\'ve", " \'ve", text)
-        text = re.sub(r"n\'t", " n\'t", text)
-        text = re.sub(r"\'re", " \'re", text)
-        text = re.sub(r"\'d", " \'d", text)
-        text = re.sub(r"\'ll", " \'ll", text)
-        text = re.sub(r",", " , ", text) # space around punctuation
-        text = re.sub(r"!", " ! ", text)
-        text = re.sub(r"\(", " \( ", text)
-        text = re.sub(r"\)", " \) ", text)
-        text = re.sub(r"\?", " \? ", text)
-        text = re.sub(r"(\D)(\d+)(\D)", "\1 \2 \3", text)
-        text = re.sub(r"\s{2,}", " ", text) # condense whitespace
-        speaker.text = text.strip().lower()
-    return argument.speakers # capitalization not important
-
-def batches(text_data, extra_data, output_data, batch_size, num_epochs, shuffle=True):
-    data = np.array(list(zip(text_data, extra_data, output_data)))
-    data_size = len(data)
-    num_batches_per_epoch = int(data_size / batch_size) + 1
+    # normalized text of every utterance, in the same order as argument.speakers
+    return tokenizer.normalize_batch([speaker.text for speaker in argument.speakers])
+
+def argument_features(argument, default_num_justices=9):
+    # summary_features with the argument's own number of justices, if it has one
+    return summary_features(argument, argument.num_justices or default_num_justices)
+
+def summary_features(argument, num_justices):
+    # the 15 side-summary features the models in model.py are trained on
+    pet, resp, jus = argument.side_summaries[:3]
+    p_words = float(pet["words_spoken"])
+    r_words = float(resp["words_spoken"])
+    j_words = float(jus["words_spoken"])
+    return [
+            float(pet["interruptions"]) / p_words,
+            float(pet["times_spoken"]) / p_words,
+            float(pet["laughter"]) / p_words,
+            float(len(argument.petitioner["counsel"])),
+            float(pet["num_int_by"]),
+            float(resp["interruptions"]) / r_words,
+            float(resp["times_spoken"]) / r_words,
+            float(resp["laughter"]) / r_words,
+            float(len(argument.respondent["counsel"])),
+            float(resp["num_int_by"]),
+            float(jus["interruptions"]) / j_words,
+            float(jus["times_spoken"]) / j_words,
+            float(jus["laughter"]) / j_words,
+            float(num_justices),
+            float(jus["num_int_by"]),
+        ]
+
+def batches(data, batch_size, num_epochs, shuffle=True, drop_last=False, seed=None):
+    """
+    Yield tuples of batches, one batch from each array in data, for
+    num_epochs epochs.  Only an index permutation is shuffled: unshuffled
+    batches are views, and shuffled ones are gathered from the arrays.
+    With drop_last, a final batch smaller than batch_size is skipped.
+    """
+    data = [np.asarray(array) for array in data]
+    data_size = len(data[0])
+    num_batches_per_epoch = batches_per_epoch(data_size, batch_size, drop_last)
+    random = np.random.RandomState(seed)
 
     for epoch in range(num_epochs):
-        # Shuffle
-        if shuffle:
-            shuffle_indices = np.random.permutation(np.arange(data_size))
-            shuffled_data = data[shuffle_indices]
-        else:
-            shuffled_data = data
+        indices = random.permutation(data_size) if shuffle else None
         for batch_num in range(num_batches_per_epoch):
             start_index = batch_num * batch_size
             end_index = min((batch_num + 1) * batch_size, data_size)
-            yield shuffled_data[start_index : end_index]
+            if indices is None:
+                yield tuple(array[start_index:end_index] for array in data)
+            else:
+                batch_indices = indices[start_index:end_index]
+                yield tuple(array.take(batch_indices, axis=0) for array in data)
+
+def bucketed_batches(text, data, batch_size, num_epochs, pool_batches=50, drop_last=False, seed=None):
+    """
+    Like batches, for padded text and the other arrays in data, but every
+    batch holds utterances of similar length and is padded only to its
+    longest one.  Each epoch shuffles the utterances, sorts them by length
+    pool_batches batches at a time, and shuffles the resulting batches.
+    """
+    text = np.asarray(text)
+    data = [np.asarray(array) for array in data]
+    lengths = sequence_lengths(text)
+    data_size = len(text)
+    num_batches_per_epoch = batches_per_epoch(data_size, batch_size, drop_last)
+    pool_size = pool_batches * batch_size
+    random = np.random.RandomState(seed)
+
+    for epoch in range(num_epochs):
+        indices = random.permutation(data_size)
+        for start_index in range(0, data_size, pool_size):
+            pool = indices[start_index:start_index + pool_size]
+            # stable, so equal lengths stay shuffled
+            indices[start_index:start_index + pool_size] = pool[np.argsort(lengths[pool], kind="mergesort")]
+        for batch_num in random.permutation(num_batches_per_epoch):
+            batch_indices = indices[batch_num * batch_size:(batch_num + 1) * batch_size]
+            max_words = max(int(lengths[batch_indices].max()), 1)
+            yield (text[batch_indices, :max_words],) + tuple(array.take(batch_indices, axis=0) for array in data)
+
+def sequence_lengths(text):
+    # padded token ids are 0
+    return np.count_nonzero(text, axis=1)
+
+def batches_per_epoch(data_size, batch_size, drop_last=False):
+    if drop_last:
+        return data_size // batch_size
+    return -(-data_size // batch_size)
+
+def prep_data(table, outcomes):
+    # like util.prepData: adds derived features and the matching SCDB outcome
+    # (from an outcomes.Outcomes) to a feature_table.FeatureTable, dropping
+    # cases whose outcome can't be found
+    found, joined = outcomes.join(table.case_numbers)
+    table = table.take(found)
+
+    columns = table.columns
+    columns["votes"] = table.votes()
+    columns["int_diff"] = columns["p_interruptions"] - columns["r_interruptions"]
+    columns["words_diff"] = columns["p_words"] - columns["r_words"]
+    columns["counsel_diff"] = columns["p_num_counsel"] - columns["r_num_counsel"]
+    columns.update(joined)
+    return table
@@ -0,0 +1,130 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import numpy as np
+import tensorflow as tf
+
+# Tokenized utterances in sharded TFRecord files, so the text models can
+# train on a corpus bigger than memory.  Each record is a tf.train.Example
+# with the utterance's token ids ("text"), its side (0, 1 or 2 for
+# petitioner, respondent or neither) and the argument's outcome vector.
+# The metadata keeps the corpus vocabulary and its counts, so that train.py
+# can map the exported ids onto a bounded vocabulary of its own.
+
+METADATA_FILE = "metadata.json"
+
+def export_corpus(corpus, out_dir, examples_per_shard=10000, seed=None):
+    """
+    Write every utterance of a corpus_cache.Corpus to shards in out_dir, in
+    shuffled order, so a bounded shuffle buffer is enough when reading them.
+    The corpus is memory-mapped, so this runs in fixed memory too.
+    """
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    order = np.random.RandomState(seed).permutation(len(corpus))
+    lengths = corpus.lengths()
+    counts = np.bincount(corpus.tokens, minlength=corpus.vocab_size())
+
+    shards = []
+    for start_index in range(0, len(order), examples_per_shard):
+        shard = "shard-{:05d}.tfrecord".format(len(shards))
+        writer = tf.python_io.TFRecordWriter(os.path.join(out_dir, shard))
+        for i in order[start_index:start_index + examples_per_shard]:
+            example = make_example(corpus.utterance(i), corpus.sides[i], corpus.outputs[i])
+            writer.write(example.SerializeToString())
+        writer.close()
+        shards.append(shard)
+
+    metadata = {
+        "shards": shards,
+        "num_examples": len(order),
+        "vocab_size": corpus.vocab_size(),
+        "max_words": int(lengths.max()) if len(lengths) else 0,
+        "vocabulary": list(corpus.vocabulary),
+        "counts": counts[1:].tolist(),
+    }
+    with open(os.path.join(out_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+def read_metadata(records_dir):
+    with open(os.path.join(records_dir, METADATA_FILE)) as f:
+        return json.load(f)
+
+def shard_files(records_dir, metadata):
+    return [os.path.join(records_dir, shard) for shard in metadata["shards"]]
+
+def make_example(tokens, side, output):
+    int64 = lambda values: tf.train.Feature(int64_list=tf.train.Int64List(value=values))
+    return tf.train.Example(features=tf.train.Features(feature={
+        "text": int64(list(map(int, tokens))),
+        "side": int64([int(side)]),
+        "output": int64(list(map(int, output))),
+    }))
+
+def parse_example(record):
+    feature = tf.train.Example.FromString(record).features.feature
+    return (feature["text"].int64_list.value,
+            feature["side"].int64_list.value[0],
+            feature["output"].int64_list.value)
+
+def read_examples(filenames):
+    for filename in filenames:
+        for record in tf.python_io.tf_record_iterator(filename):
+            yield parse_example(record)
+
+def shuffled(examples, buffer_size, random):
+    """
+    Shuffle a stream while holding at most buffer_size items: each new
+    item replaces a random one from the buffer, which is emitted.
+    """
+    buffer = []
+    for example in examples:
+        if len(buffer) < buffer_size:
+            buffer.append(example)
+            continue
+        i = random.randint(buffer_size)
+        yield buffer[i]
+        buffer[i] = example
+    random.shuffle(buffer)
+    for example in buffer:
+        yield example
+
+def stream_batches(filenames, batch_size, num_epochs, buffer_size=10000, max_words=None, seed=None, lookup=None):
+    """
+    Yield (text, extra, output) batches, as processor.batches does, read
+    from shards in a new order every epoch.  Text is padded to the longest
+    utterance in each batch, or to exactly max_words (truncating longer
+    ones) if it is given, and its ids mapped through lookup if that is.
+    """
+    random = np.random.RandomState(seed)
+    for epoch in range(num_epochs):
+        order = [filenames[i] for i in random.permutation(len(filenames))]
+        batch = []
+        for example in shuffled(read_examples(order), buffer_size, random):
+            batch.append(example)
+            if len(batch) == batch_size:
+                yield pad(batch, max_words, lookup)
+                batch = []
+        if batch:
+            yield pad(batch, max_words, lookup)
+
+def load_examples(filenames, max_words=None, lookup=None):
+    # for an evaluation set, which has to fit in memory anyway
+    return pad(list(read_examples(filenames)), max_words, lookup)
+
+def pad(examples, max_words=None, lookup=None):
+    lengths = [len(tokens) for tokens, _, _ in examples]
+    if max_words is None:
+        max_words = max(max(lengths), 1)
+    text = np.zeros([len(examples), max_words], dtype=np.int32)
+    for i, (tokens, _, _) in enumerate(examples):
+        tokens = tokens[:max_words]
+        text[i, :len(tokens)] = tokens
+    if lookup is not None:
+        text = lookup[text]
+    sides = np.array([side for _, side, _ in examples])
+    extra = np.eye(3, dtype=np.float32)[sides]
+    output = np.array([output for _, _, output in examples], dtype=np.float32)
+    return text, extra, output
@@ -3,25 +3,26 @@ from tensorflow.python.ops import rnn, rnn_cell
 
 class Model(object):
     """
-    A recurrent neural network for text classification.
+    A recurrent neural network for text classification.  max_words may be
+    None, so every batch can be padded to its own longest utterance.
     """
 
     def __init__(self, max_words, num_classes, vocab_size, 
-            embedding_size, num_hidden):
+            embedding_size, num_hidden, num_extra=3):
 
         # input, output, dropout placeholders
         self.text = tf.placeholder(tf.int32, [None, max_words], name="input_text")
-        self.extra = tf.placeholder(tf.int32, [None, max_words], name="input_extra")
+        self.extra = tf.placeholder(tf.float32, [None, num_extra], name="input_extra")
         self.output = tf.placeholder(tf.float32, [None, num_classes], name="output_y")
         self.sequence_lengths = tf.placeholder(tf.int32, [None], name="sequence_lengths")
         self.dropout_prob = tf.placeholder(tf.float32, name="dropout_probability")
 
         # Word embedding layer
         with tf.device("/cpu:0"), tf.name_scope("word_embedding"):
-            embedding_matrix = tf.Variable(
+            self.embedding_matrix = tf.Variable(
                     tf.random_uniform([vocab_size, embedding_size], -1.0, 1.0), # random numbers between -1 and 1
                     name="embedding_matrix")
-            self.lookup = tf.nn.embedding_lookup(embedding_matrix, self.text)
+            self.lookup = tf.nn.embedding_lookup(self.embedding_matrix, self.text)
 
         # GRU
         with tf.name_scope("GRU"):
@@ -30,8 +31,9 @@ class Model(object):
                     self.lookup,
                     dtype=tf.float32,
                     sequence_length=self.sequence_lengths)
-            output = tf.transpose(output, [1, 0, 2])
-            self.gru = tf.gather(output, int(output.get_shape()[0]) - 1)
+            # the state stops updating at each sequence's length, so it holds
+            # the last real output whatever the padding
+            self.gru = state
 
         # Add dropout
         with tf.name_scope("dropout"):
@@ -40,9 +42,9 @@ class Model(object):
         # add in extra data and relu layer
         with tf.name_scope("extra_data"):
             combined = tf.concat(1, [self.dropout, self.extra])
-            weights_e = tf.Variable(tf.truncated_normal([num_hidden, num_hidden], stddev=0.1), name="weights_extra")
+            weights_e = tf.Variable(tf.truncated_normal([num_hidden + num_extra, num_hidden], stddev=0.1), name="weights_extra")
             biases_e = tf.Variable(tf.constant(0.1, shape=[num_hidden]), name="biases_extra")
-            processed = tf.relu(tf.matmul(combined, weights_e) + biases_e)
+            processed = tf.nn.relu(tf.matmul(combined, weights_e) + biases_e)
 
         # Final output
         with tf.name_scope("output"):
@@ -0,0 +1,72 @@
+import argparse
+import numpy as np
+import time
+
+import utterance_index
+
+# Search the utterances of arguments/ through the index in index_dir, which
+# is first brought up to date with any new or changed transcripts.  For
+# example, laughter right after a question from Justice Scalia:
+#
+#   python search_arguments.py laughter --after '?' --after_speaker scalia
+#
+# parser.js keeps only the justices' turns, so --side is "justices" for every
+# utterance it saved; --during picks the justices' questions to one side.
+
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("query",
+            help="Words, \"quoted phrases\", AND, OR, NOT and parentheses")
+parser.add_argument("--arguments_dir", default="arguments/",
+            help="Directory to read parsed arguments from")
+parser.add_argument("--index_dir", default="runs/utterance_index/",
+            help="Directory to keep the index in (default: 'runs/utterance_index/')")
+parser.add_argument("--cases", default="",
+            help="Comma-separated cases to search (default: all of them)")
+parser.add_argument("--speaker", default="",
+            help="Only utterances by people whose names contain this (default: anyone)")
+parser.add_argument("--side", default="", choices=[""] + utterance_index.SIDES,
+            help="Only utterances by speakers on this side; always 'justices' in files from parser.js (default: any)")
+parser.add_argument("--during", default="", choices=[""] + utterance_index.SIDES,
+            help="Only utterances during this side's argument (default: any)")
+parser.add_argument("--start_date", default=None,
+            help="Only cases argued on or after this YYYY-MM-DD date")
+parser.add_argument("--end_date", default=None,
+            help="Only cases argued on or before this YYYY-MM-DD date")
+parser.add_argument("--after", default="",
+            help="Only utterances right after one matching this query (default: none)")
+parser.add_argument("--after_speaker", default="",
+            help="...and spoken by someone whose name contains this")
+parser.add_argument("--limit", type=int, default=20,
+            help="Most matches to print (default: 20, 0 for none)")
+F = parser.parse_args()
+
+def matching_names(index, text):
+    return [name for name in index.names if text.lower() in name.lower()] if text else None
+
+start_time = time.time()
+index, reindexed, unchanged = utterance_index.update(F.index_dir, F.arguments_dir)
+print("Index loaded in {:.3f}s ({} files reindexed, {} unchanged)."
+        .format(time.time() - start_time, reindexed, unchanged))
+
+start_time = time.time()
+matches = index.filter(index.search(F.query),
+        cases=[case.strip() for case in F.cases.split(",") if case.strip()] or None,
+        names=matching_names(index, F.speaker),
+        sides=[F.side] if F.side else None,
+        turns=[F.during] if F.during else None,
+        start_date=F.start_date, end_date=F.end_date)
+if F.after:
+    before = index.filter(index.search(F.after), names=matching_names(index, F.after_speaker))
+    matches = np.intersect1d(matches, index.following(before), assume_unique=True)
+elapsed = time.time() - start_time
+
+if F.side and F.side != "justices" and not np.any(index.sides == utterance_index.SIDES.index(F.side)):
+    print("No utterances by the {} are indexed (parser.js saves only the justices' turns); "
+            "try --during {}".format(F.side, F.side))
+
+for u in matches[:F.limit]:
+    case, number = index.locate(u)
+    print("{} #{} {}: {}".format(case, number, index.speaker(u), index.text(u)))
+print("{} matching utterances in {} cases, found in {:.3f}ms."
+        .format(len(matches), len(set(index.utterance_cases[matches])), 1000 * elapsed))
@@ -0,0 +1,120 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+# Full-batch solvers for the linear models, as a faster alternative to
+# training them with TensorFlow.  Both problems are small and convex.
+
+def logistic_regression(x, y, beta, tol=1e-8, max_iterations=100):
+    """
+    Minimize the loss of log_reg.Model by Newton's method (IRLS):
+        mean(cross entropy) + beta * l2_loss(weights)
+    with y holding 0/1 labels for the first class.  The two-class softmax
+    only depends on the difference of its columns, so this fits one column,
+    v, and splits it as [v/2, -v/2], which has the smallest l2_loss.
+    Returns (weights, biases, iterations) in the shapes log_reg.Model uses.
+    """
+    x, n, d = with_bias(x)
+    y = np.asarray(y, dtype=np.float64).reshape(-1)
+    # l2_loss(w) = sum(w**2)/2, and l2_loss([v/2, -v/2]) = sum(v**2)/4
+    penalty = np.append(np.full(d, beta / 2), 0) # the bias isn't regularized
+
+    def objective(v):
+        z = np.dot(x, v)
+        return np.mean(np.logaddexp(0, z) - y*z) + np.dot(penalty, v**2) / 2
+
+    v = np.zeros(d + 1)
+    loss = objective(v)
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        p = sigmoid(np.dot(x, v))
+        gradient = np.dot(x.T, p - y) / n + penalty * v
+        if np.max(np.abs(gradient)) < tol:
+            break
+        hessian = np.dot(x.T * (p * (1 - p)), x) / n + np.diag(penalty + 1e-12)
+        step = np.linalg.solve(hessian, gradient)
+
+        # backtrack if the full step overshoots
+        size = 1.0
+        while size > 1e-10:
+            new_loss = objective(v - size*step)
+            if new_loss <= loss - 1e-4 * size * np.dot(gradient, step):
+                break
+            size /= 2
+        v -= size*step
+        loss = new_loss
+
+    weights = np.stack([v[:d] / 2, -v[:d] / 2], axis=1)
+    biases = np.array([v[d] / 2, -v[d] / 2])
+    return weights, biases, iterations
+
+def svm(x, y, c, tol=1e-3, max_iterations=1000, seed=0):
+    """
+    Minimize, by dual coordinate descent (Hsieh et al., 2008):
+        (sum(weights**2) + bias**2)/c + sum(hinge loss)
+    with y holding -1/+1 labels.  As in liblinear, the bias is a weight on a
+    constant feature, so unlike svm_loss in svm.py it is regularized too;
+    svm.py also calls this on standardized features, so the weights it
+    penalizes are those of the scaled features.  Returns (weights, bias,
+    iterations), where an iteration is one pass over the data.
+    """
+    x, n, d = with_bias(x)
+    y = np.asarray(y, dtype=np.float64).reshape(-1)
+    # scaled by c/2, the loss is 0.5*|w|^2 + (c/2)*sum(hinge loss)
+    upper = c / 2
+    q = np.einsum("ij,ij->i", x, x)
+    alpha = np.zeros(n)
+    w = np.zeros(d + 1)
+    random = np.random.RandomState(seed)
+
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        max_violation = -np.inf
+        min_violation = np.inf
+        for i in random.permutation(n):
+            if q[i] == 0:
+                continue
+            gradient = y[i] * np.dot(w, x[i]) - 1
+            if alpha[i] == 0:
+                projected = min(gradient, 0)
+            elif alpha[i] == upper:
+                projected = max(gradient, 0)
+            else:
+                projected = gradient
+            max_violation = max(max_violation, projected)
+            min_violation = min(min_violation, projected)
+            if projected != 0:
+                old = alpha[i]
+                alpha[i] = min(max(old - gradient/q[i], 0), upper)
+                w += (alpha[i] - old) * y[i] * x[i]
+        if max_violation - min_violation < tol:
+            break
+
+    return w[:d], w[d], iterations
+
+def standardize(x):
+    """
+    Scale every feature to mean 0 and variance 1, which the dual solver
+    needs to converge quickly: raw features range from about 0.001 to 300.
+    Returns the scaled features and what to undo it with.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    mean = np.mean(x, axis=0)
+    std = np.std(x, axis=0)
+    std[std == 0] = 1
+    return (x - mean) / std, mean, std
+
+def unstandardize(weights, bias, mean, std):
+    # the same linear function, on the original features
+    weights = weights / std
+    return weights, bias - np.dot(weights, mean)
+
+def with_bias(x):
+    x = np.asarray(x, dtype=np.float64)
+    n, d = x.shape
+    return np.hstack([x, np.ones((n, 1))]), n, d
+
+def sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))
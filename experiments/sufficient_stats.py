@@ -0,0 +1,191 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+import naive_bayes
+
+PETITIONER = 1
+RESPONDENT = 0
+
+class Statistics(object):
+    """
+    Per-class count, mean and sum of squared deviations (M2) of every feature,
+    enough to rebuild the Gaussian Naive Bayes model without the data.  Row 0
+    holds petitioner wins and row 1 respondent wins, as in naive_bayes.Model.
+    Single cases are added and removed with Welford's algorithm.  cases is the
+    set of case numbers the statistics are made of, when they're known, so that
+    no case is counted twice.
+    """
+    def __init__(self, keys, count=None, mean=None, m2=None, cases=None):
+        self.keys = list(keys)
+        self.cases = None if cases is None else set(cases)
+        d = len(self.keys)
+        self.count = np.zeros(2) if count is None else np.array(count, dtype=np.float64)
+        self.mean = np.zeros([2, d]) if mean is None else np.array(mean, dtype=np.float64)
+        self.m2 = np.zeros([2, d]) if m2 is None else np.array(m2, dtype=np.float64)
+
+    def add(self, x, side, case=None):
+        if case is not None and self.cases is not None:
+            if case in self.cases:
+                raise ValueError("Case {} is already in the statistics".format(case))
+            self.cases.add(case)
+        row = class_row(side)
+        x = np.asarray(x, dtype=np.float64)
+        self.count[row] += 1
+        delta = x - self.mean[row]
+        self.mean[row] += delta / self.count[row]
+        self.m2[row] += delta * (x - self.mean[row])
+
+    def remove(self, x, side, case=None):
+        if case is not None and self.cases is not None:
+            if case not in self.cases:
+                raise ValueError("Case {} is not in the statistics".format(case))
+            self.cases.remove(case)
+        row = class_row(side)
+        x = np.asarray(x, dtype=np.float64)
+        if self.count[row] <= 1:
+            self.count[row] = 0
+            self.mean[row] = 0
+            self.m2[row] = 0
+            return
+        self.count[row] -= 1
+        delta = x - self.mean[row]
+        self.mean[row] -= delta / self.count[row]
+        self.m2[row] -= delta * (x - self.mean[row])
+
+    def variance(self):
+        # population variance, as util.variance computes it
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.m2 / self.count[:, None]
+
+    def prior(self):
+        return self.count[0] / np.sum(self.count)
+
+    def model(self):
+        variance = self.variance()
+        return naive_bayes.Model(
+                keys = self.keys,
+                prior = self.prior(),
+                mean_pet = self.mean[0],
+                var_pet = variance[0],
+                mean_resp = self.mean[1],
+                var_resp = variance[1],
+            )
+
+    def update_thresholds(self, rows):
+        """
+        Copy the prior, means and variances into rows in the thresholds.csv
+        format.  Thresholds, likelihoods and evidence are left alone.
+        """
+        variance = self.variance()
+        rows[0]["likelihood"] = self.prior()
+        index = {key: i for i, key in enumerate(self.keys)}
+        for row in rows[1:]:
+            i = index[row["key"]]
+            row["mean_pet"], row["var_pet"] = self.mean[0, i], variance[0, i]
+            row["mean_resp"], row["var_resp"] = self.mean[1, i], variance[1, i]
+        return rows
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            cases = {} if self.cases is None else {"cases": np.array(sorted(self.cases), dtype=np.str_)}
+            np.savez(f, keys=np.array(self.keys), count=self.count,
+                    mean=self.mean, m2=self.m2, **cases)
+
+def load(filename):
+    with np.load(filename) as stored:
+        # files saved before cases were recorded can't be checked
+        cases = [str(case) for case in stored["cases"]] if "cases" in stored else None
+        return Statistics([str(k) for k in stored["keys"]],
+                stored["count"], stored["mean"], stored["m2"], cases)
+
+def from_data(x, y, keys, cases=None):
+    """
+    Statistics of a whole feature matrix at once, with y 1 when the
+    petitioner won.  cases are the case numbers of the rows, if known.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y)
+    stats = Statistics(keys, cases=cases)
+    for row, side in enumerate([PETITIONER, RESPONDENT]):
+        group = x[y == side]
+        stats.count[row] = len(group)
+        if len(group):
+            stats.mean[row] = np.mean(group, axis=0)
+            stats.m2[row] = np.sum((group - stats.mean[row])**2, axis=0)
+    return stats
+
+def class_row(side):
+    return 0 if side == PETITIONER else 1
+
+def fold_statistics(x, y, folds, k):
+    """
+    count, mean and M2 arrays of shape [k, 2, ...], one set per fold, for
+    cases with folds in range(k).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    rows = np.where(np.asarray(y) == PETITIONER, 0, 1)
+    tested = (folds >= 0) & (folds < k)
+    group = (folds * 2 + rows)[tested]
+    x = x[tested]
+
+    count = np.bincount(group, minlength=2 * k).astype(np.float64)
+    total = np.zeros([2 * k, x.shape[1]])
+    np.add.at(total, group, x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count[:, None] > 0, total / count[:, None], 0)
+    m2 = np.zeros_like(total)
+    np.add.at(m2, group, (x - mean[group])**2)
+
+    return count.reshape(k, 2), mean.reshape(k, 2, -1), m2.reshape(k, 2, -1)
+
+def subtract(count, mean, m2, part_count, part_mean, part_m2):
+    """
+    Statistics of a set after taking out a part of it, the inverse of Chan's
+    parallel merge.  Broadcasts, so many parts can be taken out at once.
+    """
+    rest_count = count - part_count
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rest_mean = (count[..., None] * mean - part_count[..., None] * part_mean) / rest_count[..., None]
+        delta = part_mean - rest_mean
+        rest_m2 = m2 - part_m2 - delta**2 * (rest_count * part_count / count)[..., None]
+    return rest_count, rest_mean, rest_m2
+
+def cross_validate(x, y, k):
+    """
+    k-fold cross-validation of the Gaussian Naive Bayes model, with folds
+    split as util.crossValidate does.  Each fold's model is the statistics of
+    the whole data minus the statistics of the fold, so no fold is refit from
+    scratch.  With k equal to the number of cases this is leave-one-out.
+
+    Returns the petitioner win probability of every case under the model
+    that didn't see it, and each case's fold (-1 if never tested).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if not 2 <= k <= n:
+        raise ValueError("Can't cross-validate {} cases with {} folds; k must be between 2 and {}"
+                .format(n, k, n))
+    amount = n // k
+    folds = np.arange(n) // amount
+    folds[folds >= k] = -1 # the remainder is only ever trained on
+
+    stats = from_data(x, y, range(x.shape[1]))
+    fold_count, fold_mean, fold_m2 = fold_statistics(x, y, folds, k)
+    count, mean, m2 = subtract(stats.count, stats.mean, stats.m2,
+            fold_count, fold_mean, fold_m2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = m2 / count[..., None]
+        prior = count / np.sum(count, axis=1, keepdims=True)
+
+    # score every tested case under its own fold's model: [cases, classes, features]
+    tested = folds >= 0
+    case_folds = folds[tested]
+    mean, variance = mean[case_folds], variance[case_folds]
+    log_likelihood = -0.5 * (np.log(2 * np.pi * variance)
+            + (x[tested][:, None, :] - mean)**2 / variance)
+    log_joint = np.log(prior[case_folds]) + np.sum(log_likelihood, axis=2)
+
+    prob = np.full(n, np.nan)
+    prob[tested] = naive_bayes.normalize(log_joint)[:, 0]
+    return prob, folds
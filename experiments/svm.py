@@ -4,12 +4,17 @@ import os
 import shutil
 import time
 import processor
+import feature_table
+import prefetch
+import solvers
 
 # Command-line parameters
 tf.flags.DEFINE_float("c", 1, "C parameter of SVM cost function (default: 1)")
 tf.flags.DEFINE_integer("max_data", -1, "Maximum number of data points to use")
 tf.flags.DEFINE_integer("batch_size", 10, "Batch size (default: 10)")
 tf.flags.DEFINE_integer("num_epochs", 20, "Number of times to run through training data (default: 20)")
+tf.flags.DEFINE_integer("prefetch_batches", 8, "Batches to prepare ahead of training (default: 8)")
+tf.flags.DEFINE_string("engine", "tf", "'tf' for Adam or 'numpy' for dual coordinate descent on standardized features, with the bias regularized (default: 'tf')")
 tf.flags.DEFINE_string("data_file", "data/features.csv", 
             "File to read data from (default: 'data/features.csv')")
 
@@ -18,12 +23,11 @@ F._parse_flags()
 
 # Get data
 print("Loading data...")
-x, y  = processor.load_data(F.data_file, F.max_data)
+x, y = feature_table.load_xy(F.data_file, F.max_data)
 print("Data loaded.")
 
 print("Preparing data...")
-x = np.array(x)
-y = np.array(y)[:,:1] * 2 - 1
+y = y[:,:1] * 2 - 1
 num_features = x.shape[1]
 
 # split train vs  test
@@ -58,13 +62,15 @@ accuracy = tf.reduce_mean(tf.cast(correct_prediction, "float"))
 with tf.Session() as session:
     session.run(tf.initialize_all_variables())
 
-    def train_step(x_batch, y_batch):
-        feed_data = {
+    def feed(batch):
+        x_batch, y_batch = batch
+        return {
                 x: x_batch,
                 y: y_batch
             }
 
-        loss_val, accuracy_val = session.run([svm_loss, accuracy], feed_data)
+    def train_step(feed_data):
+        _, loss_val, accuracy_val = session.run([train_operation, svm_loss, accuracy], feed_data)
 
         print("TRAIN:  Loss {:g}  Accuracy {:g}%"
                 .format(loss_val, accuracy_val*100))
@@ -83,10 +89,24 @@ with tf.Session() as session:
 
     # Training loop
     eval_step(x_eval, y_eval)
-    for batch in processor.batches(x_train, y_train, F.batch_size, F.num_epochs):
-        x_batch, y_batch = zip(*batch)
-
-        train_step(x_batch, y_batch)
+    start_time = time.time()
+    if F.engine == "numpy":
+        # not quite svm_loss: this penalizes the bias and the weights of the
+        # standardized features, which keeps every feature on the same scale
+        x_scaled, mean, std = solvers.standardize(x_train)
+        w, b, iterations = solvers.svm(x_scaled, y_train, F.c)
+        w, b = solvers.unstandardize(w, b, mean, std)
+        session.run([weights.assign(w.reshape(-1, 1).astype(np.float32)),
+                bias.assign(np.array([b], dtype=np.float32))])
+    else:
+        iterations = 0
+        feeds = prefetch.Prefetcher(processor.batches([x_train, y_train], F.batch_size, F.num_epochs),
+                feed, capacity=F.prefetch_batches)
+        for feed_data in feeds:
+            train_step(feed_data)
+            iterations += 1
+        print(feeds.report(time.time() - start_time))
+    print("\nTrained with {} in {:.3f}s ({} iterations)"
+            .format(F.engine, time.time() - start_time, iterations))
 
     eval_step(x_eval, y_eval)
-
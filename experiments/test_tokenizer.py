@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import tokenizer
+
+# Outputs saved from the original chain of re.sub calls in processor.get_text.
+# tokenizer.normalize must give every one of them exactly.
+GOLDEN = [
+    (u"", u""),
+    (u"   ", u""),
+    (u"1996", u"1996"),
+    (u"He said -- no, I don't think so.", u"he said no , i do n't think so"),
+    (u"They'd've we'll you're I'VE N'T 's's", u"they 'd 've we 'll you 're i've n't 's 's"),
+    (u"Mr. Chief Justice, and may it please the Court:", u"mr chief justice , and may it please the court"),
+    (u"Isn't that right?  You wouldn't -- you'd have to concede that.",
+        u"is n't that right \\? you would n't you 'd have to concede that"),
+    (u"JUSTICE SCALIA: What's the -- what's the difference?",
+        u"justice scalia what 's the what 's the difference \\?"),
+]
+
+# The one intended difference: the original wrote the number rule's
+# replacement as "\1 \2 \3", not a raw string, so a number between two
+# other characters became "\x01 \x02 \x03" and lost its digits and
+# neighbours.  normalize spaces the number out instead.  Each case is the
+# input, the original output and normalize's.
+NUMBERS = [
+    (u"page 12 of the brief", u"page\x01 \x02 \x03of the brief", u"page 12 of the brief"),
+    (u"In 1996, Congress passed AEDPA.", u"in\x01 \x02 \x03, congress passed aedpa",
+        u"in 1996 , congress passed aedpa"),
+    (u"It's 12:30, isn't it? (Laughter.)",
+        u"it 's\x01 \x02 \x0330 , is n't it \\? \\( laughter \\)",
+        u"it 's 12 30 , is n't it \\? \\( laughter \\)"),
+    (u"Section 1983(a)(2)", u"section\x01 \x02 \x03\\( a \\) \\(\x01 \x02 \x03\\)",
+        u"section 1983 \\( a \\) \\( 2 \\)"),
+    (u"a1b2c3d 45 (6) 7,8!9?",
+        u"\x01 \x02 \x032\x01 \x02 \x03\x01 \x02 \x03 \\(\x01 \x02 \x03\\) \x01 \x02 \x03,\x01 \x02 \x03!\x01 \x02 \x03\\?",
+        u"a 1 b2c 3 d 45 \\( 6 \\) 7 , 8 ! 9 \\?"),
+    (u"caf\u00e9 \u2014 \u00a7 1983's \"quoted\" `tick`", u"caf \x01 \x02 \x03's quoted `tick`",
+        u"caf 1983 's quoted `tick`"),
+]
+
+def test_matches_original():
+    for text, expected in GOLDEN:
+        assert tokenizer.normalize(text) == expected
+
+def test_spaces_numbers_out():
+    for text, original, expected in NUMBERS:
+        assert u"\x01 \x02 \x03" in original
+        assert tokenizer.normalize(text) == expected
+
+def test_tokenize():
+    for text, expected in GOLDEN + [(text, expected) for text, _, expected in NUMBERS]:
+        assert tokenizer.tokenize(text) == expected.split()
+        assert tokenizer.tokenize_batch([text, text]) == [expected.split()] * 2
@@ -0,0 +1,140 @@
+from __future__ import absolute_import, division, print_function
+
+import csv
+import numpy as np
+
+# The features stats.js finds thresholds for, in the same order
+KEYS = [
+    "int_diff",
+    "words_diff",
+    "counsel_diff",
+    "p_interruptions",
+    "p_words",
+    "p_times",
+    "p_laughter",
+    "p_num_counsel",
+    "p_num_int_by",
+    "r_interruptions",
+    "r_words",
+    "r_times",
+    "r_laughter",
+    "r_num_counsel",
+    "r_num_int_by",
+    "j_interruptions",
+    "j_words",
+    "j_times",
+    "j_laughter",
+    "j_num",
+    "j_num_int_by",
+    "lower_dir",
+    "issue",
+    "natural_court",
+    "p_type",
+    "r_type",
+]
+
+FORCE_THRESHOLDS = {
+    "j_num": 8.5,
+}
+
+COLUMNS = ["key", "threshold", "likelihood", "evidence",
+        "mean_pet", "var_pet", "mean_resp", "var_resp"]
+
+def find_thresholds(x, y, keys=KEYS, force_thresholds=FORCE_THRESHOLDS):
+    """
+    Find the best threshold for every column of x, with y 1 when the
+    petitioner won.  Returns rows in the thresholds.csv format, prior first.
+
+    A threshold is best when splitting on it alone classifies the most cases
+    correctly, predicting the majority side on each side of the split.  Each
+    column is sorted once; every split between two distinct values is then
+    scored from cumulative counts of petitioner wins.  Of tied splits, the
+    one nearest halfway between the class means wins.  A column that no
+    split classifies better than the majority side alone gets its mean, as
+    stats.js's baselineThreshold does.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n, d = x.shape
+    if n == 0:
+        raise ValueError("Can't find thresholds without any cases")
+    num_pet = np.sum(y)
+    num_resp = n - num_pet
+    pet = y == 1
+    mean_pet, var_pet = class_statistics(x, pet)
+    mean_resp, var_resp = class_statistics(x, ~pet)
+
+    order = np.argsort(x, axis=0, kind="stable")
+    x_sorted = np.take_along_axis(x, order, axis=0)
+    # pet_below[i] = petitioner wins among the i + 1 smallest values
+    pet_below = np.cumsum(y[order], axis=0)[:-1]
+    below = np.arange(1, n)[:, None]
+    resp_below = below - pet_below
+    pet_above = num_pet - pet_below
+    resp_above = num_resp - resp_below
+
+    correct = (np.maximum(pet_below, resp_below) + np.maximum(pet_above, resp_above))
+    # only split between distinct values
+    correct = np.where(x_sorted[1:] > x_sorted[:-1], correct, -1)
+    midpoints = (x_sorted[1:] + x_sorted[:-1]) / 2
+    best_correct = np.max(correct, axis=0) if n > 1 else np.full(d, -1.0)
+    distance = np.where(correct == best_correct, np.abs(midpoints - (mean_pet + mean_resp) / 2), np.inf)
+    threshold = np.mean(x, axis=0)
+    if n > 1:
+        best = np.argmin(distance, axis=0)
+        improves = best_correct > max(num_pet, num_resp)
+        threshold = np.where(improves, midpoints[best, np.arange(d)], threshold)
+
+    for key, value in force_thresholds.items():
+        if key in keys:
+            threshold[list(keys).index(key)] = value
+
+    above = x > threshold
+    likelihood = np.mean(above[pet], axis=0) if np.any(pet) else np.zeros(d)
+    evidence = np.mean(above, axis=0)
+
+    rows = [{
+        "key": "prior",
+        "threshold": 0,
+        "likelihood": num_pet / n,
+        "evidence": 0,
+        "mean_pet": 0,
+        "var_pet": 0,
+        "mean_resp": 0,
+        "var_resp": 0,
+    }]
+    for i, key in enumerate(keys):
+        rows.append({
+            "key": key,
+            "threshold": threshold[i],
+            "likelihood": likelihood[i],
+            "evidence": evidence[i],
+            "mean_pet": mean_pet[i],
+            "var_pet": var_pet[i],
+            "mean_resp": mean_resp[i],
+            "var_resp": var_resp[i],
+        })
+
+    return rows
+
+def class_statistics(x, members):
+    # a side with no cases takes the statistics of all of them
+    if not np.any(members):
+        members = np.ones(len(x), dtype=bool)
+    return np.mean(x[members], axis=0), np.var(x[members], axis=0)
+
+def read_thresholds(filename):
+    with open(filename) as t_csv:
+        return list(csv.DictReader(t_csv))
+
+def write_thresholds(filename, rows):
+    with open(filename, "w") as t_csv:
+        writer = csv.DictWriter(t_csv, COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: format_number(value) if key != "key" else value
+                for key, value in row.items()})
+
+def format_number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
@@ -0,0 +1,68 @@
+from __future__ import absolute_import, division, print_function
+
+import codecs
+import re
+import string
+
+# Replacement for the chain of re.sub calls processor.get_text used to make.
+# Character filtering is a single byte translation, punctuation is spaced out
+# with str.replace, and only the suffix and number rules need a regex, both
+# compiled once.
+
+KEEP = string.ascii_letters + string.digits + "(),!?'`"
+PUNCTUATION = [
+    (",", " , "),
+    ("!", " ! "),
+    ("(", " \\( "),
+    (")", " \\) "),
+    ("?", " \\? "),
+]
+
+CONTRACTIONS = re.compile(r"'s|'ve|n't|'re|'d|'ll")
+DIGITS = re.compile(r"\d+")
+
+# every byte that isn't kept becomes a space
+TABLE = bytearray(b" " * 256)
+for character in KEEP:
+    TABLE[ord(character)] = ord(character)
+TABLE = bytes(TABLE)
+
+# non-ASCII characters are replaced by one space each while encoding
+codecs.register_error("tokenizer_space", lambda e: (u" " * (e.end - e.start), e.end))
+
+def normalize(text):
+    text = text.encode("ascii", "tokenizer_space").translate(TABLE).decode("ascii")
+    for character, replacement in PUNCTUATION:
+        text = text.replace(character, replacement)
+    text = CONTRACTIONS.sub(r" \g<0>", text) # sufixes
+    text = space_numbers(text)
+    return " ".join(text.split()).lower() # condense whitespace
+
+def space_numbers(text):
+    # Same as re.sub(r"(\D)(\d+)(\D)", r"\1 \2 \3", text), including the way
+    # a match uses up the character after the number, but only looks at runs
+    # of digits instead of trying a match at every position.
+    pieces = []
+    last = 0
+    consumed = -1
+    length = len(text)
+    for match in DIGITS.finditer(text):
+        start, end = match.span()
+        if start == 0 or end == length or start - 1 <= consumed:
+            continue
+        pieces.extend([text[last:start], " ", text[start:end], " "])
+        last = end
+        consumed = end
+    if not pieces:
+        return text
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+def normalize_batch(texts):
+    return [normalize(text) for text in texts]
+
+def tokenize(text):
+    return normalize(text).split()
+
+def tokenize_batch(texts):
+    return [normalize(text).split() for text in texts]
@@ -1,22 +1,45 @@
 import tensorflow as tf
 import numpy as np
 import os
-from tensorflow.contrib import learn
+import time
 
 import processor
-from rnn_model import Model
+import corpus_cache
+import packed_corpus
+import prefetch
+import records
+import vocabulary
+import word_vectors
+import rnn_model
+import cnn_model
 
 # Model Hyperparameters
+tf.flags.DEFINE_string("model", "gru", "'gru' for rnn_model or 'cnn' for cnn_model (default: 'gru')")
 tf.flags.DEFINE_integer("embedding_dim", 200, "Dimensionality of character embedding (default: 100)")
 tf.flags.DEFINE_integer("num_hidden", 50, "Number of hidden units in GRU (default: 50)")
 tf.flags.DEFINE_float("dropout_prob", 0.75, "Dropout keep probability (default: 0.5)")
+tf.flags.DEFINE_string("word_vectors", "", "Directory of pretrained vectors from convert_vectors.py to start the embeddings from (default: none)")
+tf.flags.DEFINE_string("filter_sizes", "3,4,5", "Comma-separated CNN filter sizes (default: '3,4,5')")
+tf.flags.DEFINE_integer("num_filters", 100, "Number of CNN filters of each size (default: 100)")
+tf.flags.DEFINE_integer("max_words", 0, "Words to pad or truncate utterances to for the CNN (default: 0, the longest)")
 
 # Training parameters
 tf.flags.DEFINE_integer("max_data", -1, "Maximum number of data points to use")
+tf.flags.DEFINE_string("cache_dir", "", "Directory to cache the tokenized corpus in (default: no cache)")
+tf.flags.DEFINE_string("pack_dir", "", "Packed corpus from pack_arguments.py to read arguments from (default: arguments/)")
+tf.flags.DEFINE_string("records_dir", "", "Directory of shards from export_records.py to stream instead (default: none)")
+tf.flags.DEFINE_string("vocab_file", "runs/vocabulary.npz", "File to keep the vocabulary in between runs (default: 'runs/vocabulary.npz')")
+tf.flags.DEFINE_integer("min_frequency", 1, "Times a word must appear to get its own id (default: 1)")
+tf.flags.DEFINE_integer("max_vocab", 0, "Most words to give ids to (default: 0, no limit)")
+tf.flags.DEFINE_integer("hash_buckets", 0, "Hash words into this many ids instead of keeping a vocabulary (default: 0)")
+tf.flags.DEFINE_integer("shuffle_buffer", 10000, "Utterances to shuffle together when streaming (default: 10000)")
 tf.flags.DEFINE_integer("batch_size", 10, "Batch Size (default: 10)")
 tf.flags.DEFINE_integer("num_epochs", 20, "Number of training epochs (default: 100)")
 tf.flags.DEFINE_integer("evaluate_every", 50, "Evaluate model on dev set after this many steps (default: 5)")
 tf.flags.DEFINE_integer("checkpoint_every", 100, "Save model after this many steps (default: 20)")
+tf.flags.DEFINE_integer("bucket_pool", 50, "Batches of utterances to sort by length together, or 0 to pad to the longest overall (default: 50)")
+tf.flags.DEFINE_integer("prefetch_batches", 8, "Batches to prepare ahead of training (default: 8)")
+tf.flags.DEFINE_integer("prefetch_threads", 1, "Threads to prepare batches with (default: 1)")
 # Misc Parameters
 tf.flags.DEFINE_boolean("allow_soft_placement", True, "Allow device soft device placement")
 tf.flags.DEFINE_boolean("log_device_placement", False, "Log placement of ops on devices")
@@ -27,28 +50,67 @@ F._parse_flags()
 
 # Data
 print("Loading data...")
-input_text, input_extra, y = processor.load_data(F.max_data)
-print("Data loaded.")
-
-# Build vocabulary
+start_time = time.time()
+# Build vocabulary, keeping the ids of an earlier run's
 print("Building vocabulary...")
-max_document_length = max([len(t.split(" ")) for t in input_text])
-vocab_processor = learn.preprocessing.VocabularyProcessor(max_document_length)
-text = np.array(list(vocab_processor.fit_transform(input_text)))
-print("Vocabulary built.")
+vocab = vocabulary.load_or_create(F.vocab_file, F.min_frequency, F.max_vocab, F.hash_buckets)
+lookup = None
+if F.records_dir:
+    # stream the shards from disk, holding out the last one for evaluation
+    metadata = records.read_metadata(F.records_dir)
+    shards = records.shard_files(F.records_dir, metadata)
+    if len(shards) < 2:
+        raise ValueError("Need at least two shards, one of them for evaluation")
+    train_shards, eval_shards = shards[:-1], shards[-1:]
+    if "vocabulary" not in metadata:
+        raise ValueError("{} was exported without its vocabulary; export it again with export_records.py"
+                .format(F.records_dir))
+    vocab.update_counts(metadata["vocabulary"], metadata["counts"], replace=True)
+    # from the exported ids to the vocabulary's, as each batch is read
+    lookup = np.append(vocabulary.PADDING_ID, vocab.ids(metadata["vocabulary"]))
+    max_words = F.max_words or metadata["max_words"]
+elif F.cache_dir:
+    corpus = corpus_cache.load_corpus(F.cache_dir, F.max_data)
+    counts = np.bincount(corpus.tokens, minlength=corpus.vocab_size())
+    vocab.update_counts(corpus.vocabulary, counts[1:], replace=True)
+    # from the cache's ids to the vocabulary's
+    text = np.append(vocabulary.PADDING_ID, vocab.ids(corpus.vocabulary))[corpus.padded()]
+    input_extra = corpus.side_vectors()
+    y = corpus.outputs
+else:
+    arguments = packed_corpus.load(F.pack_dir).arguments(F.max_data) if F.pack_dir else None
+    input_text, input_extra, y = processor.load_data(F.max_data, arguments)
+    vocab.update(input_text, replace=True)
+    text = vocab.transform(input_text)
+vocab_size = vocab.size()
+if F.vocab_file:
+    if not os.path.exists(os.path.dirname(os.path.abspath(F.vocab_file))):
+        os.makedirs(os.path.dirname(os.path.abspath(F.vocab_file)))
+    vocab.save(F.vocab_file)
+print("Vocabulary has {} ids; the embedding matrix will take {:.1f}MB"
+        .format(vocab_size, vocab.embedding_bytes(F.embedding_dim) / 2.0**20))
+print("Data loaded in {:.3f}s.".format(time.time() - start_time))
 
-# shuffle data
 print("Preparing data...")
-shuffle_indices = np.random.permutation(np.arange(len(y)))
-text_shuffled = text[shuffle_indices]
-extra_shuffled = np.array(extra)[shuffle_indices]
-y_shuffled = np.array(y)[shuffle_indices]
-
-# split train vs  test
-amount = int(0.1 * len(x))
-text_train, text_eval = text_shuffled[:-amount], text_shuffled[-amount:]
-extra_train, extra_eval = extra_shuffled[:-amount], extra_shuffled[-amount:]
-y_train, y_eval = y_shuffled[:-amount], y_shuffled[-amount:]
+if F.records_dir:
+    text_eval, extra_eval, y_eval = records.load_examples(eval_shards,
+            max_words if F.model == "cnn" else None, lookup)
+else:
+    max_words = F.max_words or text.shape[1]
+    if F.model == "cnn":
+        text = text[:, :max_words]
+
+    # shuffle data
+    shuffle_indices = np.random.permutation(np.arange(len(y)))
+    text_shuffled = text[shuffle_indices]
+    extra_shuffled = np.array(input_extra)[shuffle_indices]
+    y_shuffled = np.array(y)[shuffle_indices]
+
+    # split train vs  test
+    amount = int(0.1 * len(y))
+    text_train, text_eval = text_shuffled[:-amount], text_shuffled[-amount:]
+    extra_train, extra_eval = extra_shuffled[:-amount], extra_shuffled[-amount:]
+    y_train, y_eval = y_shuffled[:-amount], y_shuffled[-amount:]
 print("Data prepared.")
 
 
@@ -61,13 +123,23 @@ with tf.Graph().as_default():
 
     with session.as_default():
         print("Initializing model...")
-        network = Model(
-                max_words = x_train.shape[1],
-                num_classes = 2,
-                vocab_size = len(vocab_processor.vocabulary_),
-                embedding_size = F.embedding_dim,
-                num_hidden = F.num_hidden,
-            )
+        if F.model == "cnn":
+            network = cnn_model.Model(
+                    max_words = max_words,
+                    num_classes = 2,
+                    vocab_size = vocab_size,
+                    embedding_size = F.embedding_dim,
+                    filter_sizes = list(map(int, F.filter_sizes.split(","))),
+                    num_filters = F.num_filters,
+                )
+        else:
+            network = rnn_model.Model(
+                    max_words = None if F.bucket_pool or F.records_dir else max_words,
+                    num_classes = 2,
+                    vocab_size = vocab_size,
+                    embedding_size = F.embedding_dim,
+                    num_hidden = F.num_hidden,
+                )
 
         # procedure for training
         global_step = tf.Variable(0, name="global_step", trainable=False)
@@ -96,32 +168,38 @@ with tf.Graph().as_default():
 
         saver = tf.train.Saver(tf.all_variables())
 
-        # Write vocabulary
-        vocab_processor.save(os.path.join(out_dir, "vocabulary"))
-
         # Initialize all variables
         session.run(tf.initialize_all_variables())
+        if F.word_vectors:
+            if F.records_dir or F.hash_buckets:
+                raise ValueError("Pretrained vectors need a vocabulary of words")
+            vectors = word_vectors.load(F.word_vectors)
+            if vectors.dim() != F.embedding_dim:
+                raise ValueError("{} has {}-dimensional vectors, not {}".format(
+                    F.word_vectors, vectors.dim(), F.embedding_dim))
+            matrix, found = vectors.embedding_matrix(vocab.words, vocabulary.RESERVED, vocab_size)
+            embedding_input = tf.placeholder(tf.float32, matrix.shape)
+            session.run(network.embedding_matrix.assign(embedding_input), {embedding_input: matrix})
+            print("Found pretrained vectors for {} of {} words".format(found, len(vocab.words)))
         print("Model initialized.\n")
 
 
-        def length(data):
-            length = [0] * len(data)
-            for i, item  in enumerate(data):
-                used = np.sign(item)
-                item_len = np.sum(used)
-                length[i] = item_len
-
-            return length
-
-        def train_step(text_batch, extra_batch, y_batch):
-            feed_data = {
+        def feed(text_batch, extra_batch, y_batch, dropout_prob):
+            if F.model == "cnn":
+                return {
+                        network.input: text_batch,
+                        network.output: y_batch,
+                        network.dropout_prob: dropout_prob
+                        }
+            return {
                     network.text: text_batch,
                     network.extra: extra_batch,
                     network.output: y_batch,
-                    network.sequence_lengths: length(x_batch),
-                    network.dropout_prob: F.dropout_prob
+                    network.sequence_lengths: processor.sequence_lengths(text_batch),
+                    network.dropout_prob: dropout_prob
                     }
 
+        def train_step(feed_data):
             _, step, summaries, loss, accuracy = session.run(
                     [train_operation, global_step, train_summary, network.loss, network.accuracy],
                     feed_data)
@@ -129,15 +207,8 @@ with tf.Graph().as_default():
             print("Step {}:  Loss {:g}  Accuracy {:g}%".format(step, loss, accuracy))
             train_summary_writer.add_summary(summaries, step)
 
-        def eval_step(x_batch, y_batch, writer=None):
-            feed_data = {
-                    network.text: text_batch,
-                    network.extra: extra_batch,
-                    network.output: y_batch,
-                    network.sequence_lengths: length(x_batch),
-                    network.dropout_prob: 1.0
-                    }
-
+        def eval_step(text_batch, extra_batch, y_batch, writer=None):
+            feed_data = feed(text_batch, extra_batch, y_batch, 1.0)
             step, summaries, loss, accuracy = session.run(
                     [global_step, eval_summary, network.loss, network.accuracy],
                     feed_data)
@@ -147,18 +218,42 @@ with tf.Graph().as_default():
                 writer.add_summary(summaries, step)
 
 
-        # Make batches of data
-        batches = processor.batches(text_train, extra_train, y_train, F.batch_size, F.num_epochs)
+        # Make batches of data, and their feed_dicts in the background
+        if F.records_dir:
+            batches = records.stream_batches(train_shards, F.batch_size, F.num_epochs,
+                    buffer_size=F.shuffle_buffer, max_words=max_words if F.model == "cnn" else None, lookup=lookup)
+        elif F.bucket_pool and F.model == "gru":
+            batches = processor.bucketed_batches(text_train, [extra_train, y_train],
+                    F.batch_size, F.num_epochs, pool_batches=F.bucket_pool)
+        else:
+            batches = processor.batches([text_train, extra_train, y_train], F.batch_size, F.num_epochs)
+        feeds = prefetch.Prefetcher(batches, lambda batch: feed(*batch, dropout_prob=F.dropout_prob),
+                capacity=F.prefetch_batches, num_threads=F.prefetch_threads)
 
         # Training loop
         eval_step(text_eval, extra_eval, y_eval, writer=eval_summary_writer)
-        for batch in batches:
-            text_batch, extra_batch, y_batch = zip(*batch)
-            train_step(text_batch, extra_batch, y_batch)
+        start_time = time.time()
+        step_time = 0.0
+        tokens_fed = 0
+        tokens_used = 0
+        for feed_data in feeds:
+            step_start = time.time()
+            train_step(feed_data)
+            step_time += time.time() - step_start
+            if F.model == "gru":
+                tokens_fed += feed_data[network.text].size
+                tokens_used += feed_data[network.sequence_lengths].sum()
             current_step = tf.train.global_step(session, global_step) # get step number
             if current_step % F.evaluate_every == 0:
                 eval_step(text_eval, extra_eval, y_eval, writer=eval_summary_writer)
             if current_step % F.checkpoint_every == 0:
                 path = saver.save(session, checkpoint_prefix, global_step=current_step)
                 print("Saved model checkpoint to {}\n".format(path))
-
+        print(feeds.report(time.time() - start_time))
+        if tokens_fed:
+            print("Padding was {:.1%} of tokens fed".format(1 - float(tokens_used) / tokens_fed))
+        if tokens_fed and not F.records_dir:
+            print("Padding to the longest utterance overall would be {:.1%}"
+                    .format(1 - float(processor.sequence_lengths(text_train).sum()) / text_train.size))
+        if feeds.count:
+            print("{:.1f}ms per step".format(1000 * step_time / feeds.count))
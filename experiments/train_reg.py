@@ -5,6 +5,9 @@ import shutil
 import time
 
 import processor
+import feature_table
+import prefetch
+import solvers
 from log_reg import Model
 
 # Command-line parameters
@@ -15,6 +18,8 @@ tf.flags.DEFINE_integer("max_data", -1, "Maximum number of data points to use")
 tf.flags.DEFINE_integer("batch_size", 40, "Batch size (default: 40)")
 tf.flags.DEFINE_integer("num_epochs", 80, "Number of training epochs (default: 80)")
 tf.flags.DEFINE_integer("evaluate_every", 50, "Evaluate model on dev set after this many steps (default: 50)")
+tf.flags.DEFINE_integer("prefetch_batches", 8, "Batches to prepare ahead of training (default: 8)")
+tf.flags.DEFINE_string("engine", "tf", "'tf' for gradient descent or 'numpy' for a full-batch Newton solver (default: 'tf')")
 tf.flags.DEFINE_string("data_file", "data/features.csv", 
             "File to read data from (default: 'data/features.csv')")
 
@@ -23,11 +28,9 @@ F._parse_flags()
 
 # Get data
 print("Loading data...")
-x, y  = processor.load_data(F.data_file, F.max_data)
+x, y = feature_table.load_xy(F.data_file, F.max_data)
 print("Data loaded.") 
 print("Preparing data...")
-x = np.array(x)
-y = np.array(y)
 
 # split train vs  test
 amount = int(0.1 * len(x))
@@ -79,12 +82,14 @@ with tf.Session() as session:
     session.run(tf.initialize_all_variables())
     print("Model initialized.\n")
 
-    def train_step(x_batch, y_batch):
-        feed_data = {
+    def feed(batch):
+        x_batch, y_batch = batch
+        return {
                 network.input: x_batch,
                 network.output: y_batch,
             }
 
+    def train_step(feed_data):
         _, step, summaries, loss, accuracy = session.run(
                 [train_operation, global_step, train_summary, network.loss, network.accuracy],
                 feed_data)
@@ -110,14 +115,25 @@ with tf.Session() as session:
 
     # Training loop
     eval_step(x_eval, y_eval)
-    for batch in processor.batches(x_train, y_train, F.batch_size, F.num_epochs):
-        x_batch, y_batch = zip(*batch)
-
-        train_step(x_batch, y_batch)
-        # get step number
-        current_step = tf.train.global_step(session, global_step) # get step number
-        if current_step % F.evaluate_every == 0:
-            eval_step(x_eval, y_eval)
+    start_time = time.time()
+    if F.engine == "numpy":
+        weights, biases, iterations = solvers.logistic_regression(x_train, y_train[:,0], F.beta)
+        session.run([network.weights.assign(weights.astype(np.float32)),
+                network.biases.assign(biases.astype(np.float32))])
+    else:
+        iterations = 0
+        feeds = prefetch.Prefetcher(processor.batches([x_train, y_train], F.batch_size, F.num_epochs),
+                feed, capacity=F.prefetch_batches)
+        for feed_data in feeds:
+            train_step(feed_data)
+            iterations += 1
+            # get step number
+            current_step = tf.train.global_step(session, global_step) # get step number
+            if current_step % F.evaluate_every == 0:
+                eval_step(x_eval, y_eval)
+        print(feeds.report(time.time() - start_time))
+    print("\nTrained with {} in {:.3f}s ({} iterations)"
+            .format(F.engine, time.time() - start_time, iterations))
 
     eval_step(x_eval, y_eval)
     path = saver.save(session, checkpoint_prefix)
@@ -0,0 +1,413 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import re
+import numpy as np
+
+import processor
+import tokenizer
+from corpus_cache import TOKENIZER, file_hash, concatenate
+
+# A positional inverted index over the normalized utterances of arguments/.
+# Every utterance of every transcript is one document; the postings of a
+# term are the (utterance, position) pairs it occurs at, sorted, so a term
+# is one slice and a phrase is a few sorted intersections.  Each utterance
+# also has its case, speaker and side, for filtering.  Like corpus_cache,
+# only files that changed since the last build are parsed and tokenized
+# again; the postings are then re-sorted from the token arrays in one go.
+#
+# parser.js saves only the justices' turns, so on the transcripts it writes
+# every utterance's own side is "justices".  What tells the turns apart is
+# whose argument they interrupt: the sideBefore of the utterance, kept here
+# as its turn.
+
+INDEX_VERSION = 2
+SIDES = ["petitioner", "respondent", "justices"]
+ARRAYS = ["tokens", "token_offsets", "utterance_cases", "utterance_numbers",
+        "speaker_ids", "speaker_names", "sides", "turns", "term_offsets", "posting_utterances", "posting_positions"]
+
+class UtteranceIndex(object):
+    """
+    Utterance u is utterance_numbers[u] of the speakers of case
+    cases[utterance_cases[u]], and its tokens are
+    tokens[token_offsets[u]:token_offsets[u+1]], ids into vocabulary.  The
+    postings of term t are the utterances and positions from term_offsets[t]
+    up to term_offsets[t+1].  Query results are sorted arrays of utterances.
+    """
+    def __init__(self, arrays, manifest):
+        for key in ARRAYS:
+            setattr(self, key, arrays[key])
+        self.vocabulary = manifest["vocabulary"]
+        self.names = manifest["names"]
+        entries = [manifest["files"][name] for name in manifest["order"]]
+        self.cases = [entry["case"] for entry in entries]
+        self.dates = np.array([(entry["date"] or "NaT")[:10] for entry in entries], dtype="datetime64[D]")
+        self.term_ids = dict((term, i) for i, term in enumerate(self.vocabulary))
+        self.case_ids = dict((case, i) for i, case in enumerate(self.cases))
+        self.max_length = int(np.diff(self.token_offsets).max()) if len(self) else 0
+
+    def __len__(self):
+        return len(self.utterance_cases)
+
+    def all(self):
+        return np.arange(len(self), dtype=np.int64)
+
+    def postings(self, term):
+        """
+        The utterances and positions of a normalized token.
+        """
+        t = self.term_ids.get(term)
+        if t is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        start, stop = self.term_offsets[t], self.term_offsets[t + 1]
+        return (self.posting_utterances[start:stop].astype(np.int64),
+                self.posting_positions[start:stop].astype(np.int64))
+
+    def phrase(self, text):
+        """
+        Utterances containing text, normalized as the index was, as
+        consecutive tokens.  A single word is just its postings.
+        """
+        words = tokenizer.tokenize(text)
+        if not words:
+            return np.zeros(0, dtype=np.int64)
+        # (utterance, position) pairs as one sortable key; position k of
+        # the phrase must be at the start position plus k
+        stride = self.max_length + len(words)
+        starts = None
+        for k, word in enumerate(words):
+            utterances, positions = self.postings(word)
+            keys = utterances * stride + positions - k
+            starts = keys if starts is None else np.intersect1d(starts, keys, assume_unique=True)
+            if not len(starts):
+                break
+        return unique_sorted(starts // stride)
+
+    def search(self, query):
+        """
+        Utterances matching a boolean query: words and "quoted phrases",
+        combined with AND (or just a space), OR, NOT and parentheses.
+        """
+        return QueryParser(self, query).parse()
+
+    def filter(self, utterances, cases=None, names=None, speaker_ids=None, sides=None,
+            turns=None, start_date=None, end_date=None):
+        """
+        The utterances from one of the given cases, spoken by one of the
+        named people or people ids, by someone on one of the given sides,
+        during one of the given sides' turns (see above), in a case argued
+        between start_date and end_date (inclusive, "YYYY-MM-DD").  A None
+        filter lets everything through.
+        """
+        utterances = np.asarray(utterances, dtype=np.int64)
+        keep = np.ones(len(utterances), dtype=bool)
+        case_ids = self.utterance_cases[utterances]
+        if cases is not None:
+            wanted = [self.case_ids[case] for case in cases if case in self.case_ids]
+            keep &= np.isin(case_ids, wanted)
+        if names is not None:
+            names = set(names)
+            wanted = [i for i, name in enumerate(self.names) if name in names]
+            keep &= np.isin(self.speaker_names[utterances], wanted)
+        if speaker_ids is not None:
+            keep &= np.isin(self.speaker_ids[utterances], list(speaker_ids))
+        if sides is not None:
+            keep &= np.isin(self.sides[utterances], side_ids(sides))
+        if turns is not None:
+            keep &= np.isin(self.turns[utterances], side_ids(turns))
+        if start_date is not None:
+            keep &= self.dates[case_ids] >= np.datetime64(start_date, "D")
+        if end_date is not None:
+            keep &= self.dates[case_ids] <= np.datetime64(end_date, "D")
+        return utterances[keep]
+
+    def following(self, utterances, distance=1):
+        """
+        The utterances distance after the given ones in the same case.
+        """
+        utterances = np.asarray(utterances, dtype=np.int64) + distance
+        utterances = utterances[(utterances >= 0) & (utterances < len(self))]
+        same_case = self.utterance_cases[utterances] == self.utterance_cases[utterances - distance]
+        return utterances[same_case]
+
+    def preceding(self, utterances, distance=1):
+        return self.following(utterances, -distance)
+
+    def locate(self, u):
+        """
+        The case and speakers position of utterance u.
+        """
+        return self.cases[self.utterance_cases[u]], int(self.utterance_numbers[u])
+
+    def speaker(self, u):
+        i = self.speaker_names[u]
+        return self.names[i] if i >= 0 else None
+
+    def text(self, u):
+        """
+        The normalized text of utterance u.
+        """
+        return " ".join(self.vocabulary[t] for t in self.tokens[self.token_offsets[u] : self.token_offsets[u + 1]])
+
+class QueryParser(object):
+    """
+    Recursive descent over: or := and ("OR" and)*, and := not (["AND"] not)*,
+    not := "NOT" not | "(" or ")" | phrase | word.
+    """
+    TOKENS = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+
+    def __init__(self, index, query):
+        self.index = index
+        self.tokens = self.TOKENS.findall(query)
+        self.position = 0
+
+    def parse(self):
+        result = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError("Unexpected {!r} in query".format(self.peek()))
+        return result
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        result = self.parse_and()
+        while self.peek() == "OR":
+            self.take()
+            result = np.union1d(result, self.parse_and())
+        return result
+
+    def parse_and(self):
+        result = self.parse_not()
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            if self.peek() == "NOT": # no need to build the complement
+                self.take()
+                result = np.setdiff1d(result, self.parse_not(), assume_unique=True)
+            else:
+                result = np.intersect1d(result, self.parse_not(), assume_unique=True)
+        return result
+
+    def parse_not(self):
+        token = self.take()
+        if token is None:
+            raise ValueError("Query ended early")
+        if token == "NOT":
+            return np.setdiff1d(self.index.all(), self.parse_not(), assume_unique=True)
+        if token == "(":
+            result = self.parse_or()
+            if self.take() != ")":
+                raise ValueError("Missing ) in query")
+            return result
+        if token in ("AND", "OR", ")"):
+            raise ValueError("Unexpected {!r} in query".format(token))
+        return self.index.phrase(token.strip('"'))
+
+def side_ids(sides):
+    unknown = [side for side in sides if side not in SIDES]
+    if unknown:
+        raise ValueError("Unknown side {!r}; sides are {}".format(unknown[0], ", ".join(SIDES)))
+    return [SIDES.index(side) for side in sides]
+
+def unique_sorted(values):
+    # np.unique without the sort
+    if not len(values):
+        return values
+    return values[np.concatenate([[True], values[1:] != values[:-1]])]
+
+def load(index_dir):
+    manifest = read_manifest(index_dir)
+    if not manifest["order"]:
+        raise ValueError("No index in {}".format(index_dir))
+    return open_index(index_dir, manifest)
+
+def update(index_dir, arguments_dir=processor.ARGUMENTS_DIR, num_workers=None):
+    """
+    Bring the index in index_dir up to date with arguments_dir, reading
+    only the files that are new or changed.  Returns the open index and the
+    numbers of files reindexed and unchanged.
+    """
+    filenames = processor.argument_files(arguments_dir)
+    if not filenames:
+        raise ValueError("No argument files in {}".format(arguments_dir))
+    manifest = read_manifest(index_dir)
+    old_files = manifest["files"]
+    new_files = {}
+    stale = []
+    for filename in filenames:
+        name = os.path.basename(filename)
+        stat = os.stat(filename)
+        entry = old_files.get(name)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            new_files[name] = entry
+            continue
+
+        digest = file_hash(filename)
+        if entry and entry["sha1"] == digest: # touched, but not changed
+            entry = dict(entry, mtime=stat.st_mtime, size=stat.st_size)
+        else:
+            entry = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": digest}
+            stale.append(name)
+        new_files[name] = entry
+
+    names = [os.path.basename(f) for f in filenames]
+    if not stale and names == manifest["order"]:
+        if any(new_files[n] != old_files[n] for n in names):
+            manifest["files"] = new_files
+            write_manifest(index_dir, manifest)
+        return open_index(index_dir, manifest), 0, len(names)
+
+    rebuild(index_dir, arguments_dir, manifest, names, new_files, stale, num_workers)
+    return load(index_dir), len(stale), len(names) - len(stale)
+
+def rebuild(index_dir, arguments_dir, manifest, names, files, stale, num_workers):
+    old = open_index(index_dir, manifest) if manifest["order"] else None
+    # the vocabulary and speaker names are only ever appended to, so the
+    # ids in the old arrays stay valid
+    vocabulary = manifest["vocabulary"]
+    term_ids = dict((term, i) for i, term in enumerate(vocabulary))
+    speaker_names = manifest["names"]
+    name_ids = dict((name, i) for i, name in enumerate(speaker_names))
+    parsed = processor.parse_files([os.path.join(arguments_dir, name) for name in stale],
+            num_workers=num_workers)
+    stale = set(stale)
+
+    columns = dict((key, []) for key in ["tokens", "lengths", "numbers", "speaker_ids", "speaker_names",
+            "sides", "turns"])
+    cases = []
+    count = 0
+    for name in names:
+        entry = files[name]
+        if name in stale:
+            argument = next(parsed)
+            entry["case"] = argument.case_number
+            entry["date"] = argument.date
+            parts = index_argument(argument, term_ids, vocabulary, name_ids, speaker_names)
+        else: # copy the file's utterances out of the old index
+            start, stop = entry["start"], entry["stop"]
+            parts = {
+                "tokens": old.tokens[old.token_offsets[start] : old.token_offsets[stop]],
+                "lengths": np.diff(old.token_offsets[start : stop + 1]),
+                "numbers": old.utterance_numbers[start:stop],
+                "speaker_ids": old.speaker_ids[start:stop],
+                "speaker_names": old.speaker_names[start:stop],
+                "sides": old.sides[start:stop],
+                "turns": old.turns[start:stop],
+            }
+        for key, values in parts.items():
+            columns[key].append(np.asarray(values))
+        entry["start"] = count
+        count += len(parts["lengths"])
+        entry["stop"] = count
+        cases.append(np.full(len(parts["lengths"]), len(cases), dtype=np.int32))
+
+    lengths = concatenate(columns["lengths"], np.int64)
+    arrays = {
+        "tokens": concatenate(columns["tokens"], np.int32),
+        "token_offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        "utterance_cases": concatenate(cases, np.int32),
+        "utterance_numbers": concatenate(columns["numbers"], np.int32),
+        "speaker_ids": concatenate(columns["speaker_ids"], np.int32),
+        "speaker_names": concatenate(columns["speaker_names"], np.int32),
+        "sides": concatenate(columns["sides"], np.int8),
+        "turns": concatenate(columns["turns"], np.int8),
+    }
+    arrays.update(invert(arrays["tokens"], lengths, len(vocabulary)))
+    del old, columns # release the memory maps before overwriting their files
+
+    if not os.path.exists(index_dir):
+        os.makedirs(index_dir)
+    for key in ARRAYS:
+        path = os.path.join(index_dir, key + ".npy")
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, arrays[key])
+        os.rename(path + ".tmp", path)
+
+    write_manifest(index_dir, {
+        "version": INDEX_VERSION,
+        "tokenizer": TOKENIZER,
+        "order": names,
+        "files": files,
+        "vocabulary": vocabulary,
+        "names": speaker_names,
+    })
+
+def index_argument(argument, term_ids, vocabulary, name_ids, speaker_names):
+    people = argument.people
+    tokens = []
+    lengths = []
+    ids = []
+    names = []
+    sides = []
+    turns = []
+    for speaker, text in zip(argument.speakers, processor.get_text(argument)):
+        words = text.split()
+        for word in words:
+            if word not in term_ids:
+                term_ids[word] = len(vocabulary)
+                vocabulary.append(word)
+            tokens.append(term_ids[word])
+        lengths.append(len(words))
+
+        person = people[speaker.id] if isinstance(speaker.id, int) and 0 <= speaker.id < len(people) else {}
+        name = person.get("fullName")
+        if name is not None and name not in name_ids:
+            name_ids[name] = len(speaker_names)
+            speaker_names.append(name)
+        ids.append(speaker.id if isinstance(speaker.id, int) else -1)
+        names.append(name_ids.get(name, -1))
+        sides.append(SIDES.index(person["side"]) if person.get("side") in SIDES else -1)
+        turns.append(SIDES.index(speaker.side_before) if speaker.side_before in SIDES else -1)
+    return {
+        "tokens": tokens,
+        "lengths": lengths,
+        "numbers": np.arange(len(lengths)),
+        "speaker_ids": ids,
+        "speaker_names": names,
+        "sides": sides,
+        "turns": turns,
+    }
+
+def invert(tokens, lengths, vocab_size):
+    """
+    Postings from token arrays: sorting the tokens by term, stably, leaves
+    each term's occurrences in (utterance, position) order.
+    """
+    utterances = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+    positions = np.arange(len(tokens), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    order = np.argsort(tokens, kind="stable")
+    counts = np.bincount(tokens, minlength=vocab_size)
+    return {
+        "term_offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        "posting_utterances": utterances[order],
+        "posting_positions": positions[order].astype(np.int32),
+    }
+
+def open_index(index_dir, manifest):
+    arrays = dict((key, np.load(os.path.join(index_dir, key + ".npy"), mmap_mode="r")) for key in ARRAYS)
+    return UtteranceIndex(arrays, manifest)
+
+def read_manifest(index_dir):
+    empty = {"order": [], "files": {}, "vocabulary": [], "names": []}
+    try:
+        with open(os.path.join(index_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return empty
+
+    if manifest.get("version") != INDEX_VERSION or manifest.get("tokenizer") != TOKENIZER:
+        return empty
+    return manifest
+
+def write_manifest(index_dir, manifest):
+    path = os.path.join(index_dir, "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.rename(path + ".tmp", path)
@@ -0,0 +1,136 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import zlib
+from collections import Counter
+import numpy as np
+
+# Token ids 0 and 1 are reserved for padding and for words not in the
+# vocabulary, so the embedding matrix has size() rows.
+PADDING_ID = 0
+UNKNOWN_ID = 1
+RESERVED = 2
+
+class Vocabulary(object):
+    """
+    A word to id mapping of bounded size, to replace VocabularyProcessor.
+
+    Words get ids once they have been seen min_frequency times, most frequent
+    first, until there are max_size of them (0 for no limit).  update() can
+    be called again as new transcripts arrive: words that reach
+    min_frequency are added, and ids already given out never change, so
+    trained embeddings stay valid.
+
+    With num_buckets, words are instead hashed into that many ids and no
+    words or counts are kept at all.
+    """
+    def __init__(self, min_frequency=1, max_size=0, num_buckets=0):
+        self.min_frequency = min_frequency
+        self.max_size = max_size
+        self.num_buckets = num_buckets
+        self.counts = Counter()
+        self.words = []
+        self.word_ids = {}
+
+    def size(self):
+        if self.num_buckets:
+            return RESERVED + self.num_buckets
+        return RESERVED + len(self.words)
+
+    def update(self, texts, replace=False):
+        """
+        Count the words of texts, strings of space-separated words, and
+        give ids to the ones that are now frequent enough.  With replace,
+        texts is the whole corpus, so earlier counts are forgotten instead
+        of added to (ids are kept either way).
+        """
+        counts = Counter()
+        for text in texts:
+            counts.update(text.split())
+        self.update_counts(list(counts.keys()), list(counts.values()), replace)
+
+    def update_counts(self, words, counts, replace=False):
+        # like update, with the counting already done
+        if self.num_buckets:
+            return
+        if replace:
+            self.counts = Counter()
+        for word, count in zip(words, counts):
+            if count:
+                self.counts[word] += int(count)
+        self.admit()
+
+    def admit(self):
+        room = self.max_size - len(self.words) if self.max_size else len(self.counts)
+        if room <= 0:
+            return
+        candidates = [(-count, word) for word, count in self.counts.items()
+                if count >= self.min_frequency and word not in self.word_ids]
+        for _, word in sorted(candidates)[:room]:
+            self.word_ids[word] = RESERVED + len(self.words)
+            self.words.append(word)
+
+    def id(self, word):
+        if self.num_buckets:
+            return RESERVED + zlib.crc32(word.encode("utf-8")) % self.num_buckets
+        return self.word_ids.get(word, UNKNOWN_ID)
+
+    def ids(self, words):
+        return np.array([self.id(word) for word in words], dtype=np.int32)
+
+    def transform(self, texts, max_words=None):
+        """
+        Token ids of texts, as a matrix padded with PADDING_ID to the longest
+        text, or to max_words (truncating longer texts).
+        """
+        texts = [text.split() for text in texts]
+        if max_words is None:
+            max_words = max([len(words) for words in texts] or [0])
+        ids = np.full([len(texts), max_words], PADDING_ID, dtype=np.int32)
+        for i, words in enumerate(texts):
+            words = words[:max_words]
+            ids[i, :len(words)] = self.ids(words)
+        return ids
+
+    def embedding_bytes(self, embedding_size, dtype=np.float32):
+        return self.size() * embedding_size * np.dtype(dtype).itemsize
+
+    def save(self, filename):
+        # words as one block of UTF-8 text, plus their counts: much smaller
+        # and faster to read than a pickle
+        words = self.words + [word for word in self.counts if word not in self.word_ids]
+        text = "\n".join(words).encode("utf-8")
+        with open(filename + ".tmp", "wb") as f:
+            np.savez_compressed(f,
+                    settings=np.array([self.min_frequency, self.max_size, self.num_buckets, len(self.words)]),
+                    words=np.frombuffer(text, dtype=np.uint8),
+                    counts=np.array([self.counts[word] for word in words], dtype=np.int64))
+        os.rename(filename + ".tmp", filename)
+
+def load(filename):
+    with np.load(filename) as arrays:
+        min_frequency, max_size, num_buckets, num_ids = arrays["settings"].tolist()
+        text = arrays["words"].tobytes().decode("utf-8")
+        counts = arrays["counts"].tolist()
+    words = text.split("\n") if text else []
+
+    vocabulary = Vocabulary(min_frequency, max_size, num_buckets)
+    vocabulary.counts.update(dict(zip(words, counts)))
+    vocabulary.words = words[:num_ids]
+    vocabulary.word_ids = dict((word, RESERVED + i) for i, word in enumerate(vocabulary.words))
+    return vocabulary
+
+def load_or_create(filename, min_frequency=1, max_size=0, num_buckets=0):
+    """
+    The vocabulary saved in filename, if there is one, with the given limits
+    applied to the words it admits from now on.
+    """
+    if filename and os.path.exists(filename):
+        vocabulary = load(filename)
+        vocabulary.min_frequency = min_frequency
+        vocabulary.max_size = max_size
+        if vocabulary.num_buckets != num_buckets:
+            raise ValueError("{} uses {} hash buckets, not {}".format(
+                filename, vocabulary.num_buckets, num_buckets))
+        return vocabulary
+    return Vocabulary(min_frequency, max_size, num_buckets)
@@ -0,0 +1,120 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import numpy as np
+
+# Pretrained word vectors (GloVe, word2vec text format) converted to a
+# memory-mapped matrix, so that only the rows the vocabulary needs are ever
+# read into memory.
+
+VECTORS_FILE = "vectors.npy"
+WORDS_FILE = "words.txt"
+
+class WordVectors(object):
+    """
+    A converted vector file: vectors is a memory-mapped [num_words, dim]
+    float32 matrix, and row_ids maps each word to its row.
+    """
+    def __init__(self, vectors, row_ids):
+        self.vectors = vectors
+        self.row_ids = row_ids
+
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def embedding_matrix(self, words, first_id=0, num_rows=None, seed=None):
+        """
+        An embedding matrix whose row first_id + i is the vector for
+        words[i].  Rows for words without a vector, and for ids below
+        first_id (padding, say), are uniform on [-1, 1] like the models'
+        own initialization.  Returns the matrix and how many words were
+        found.
+        """
+        if num_rows is None:
+            num_rows = first_id + len(words)
+        random = np.random.RandomState(seed)
+        matrix = random.uniform(-1.0, 1.0, [num_rows, self.dim()]).astype(np.float32)
+
+        ids = []
+        rows = []
+        for i, word in enumerate(words):
+            row = self.row_ids.get(word)
+            if row is not None:
+                ids.append(first_id + i)
+                rows.append(row)
+        if rows:
+            # read the rows in file order, which the page cache likes best
+            order = np.argsort(rows)
+            matrix[np.array(ids)[order]] = self.vectors[np.array(rows)[order]]
+        return matrix, len(rows)
+
+def load(store_dir):
+    vectors = np.load(os.path.join(store_dir, VECTORS_FILE), mmap_mode="r")
+    row_ids = {}
+    with io.open(os.path.join(store_dir, WORDS_FILE), encoding="utf-8") as f:
+        for row, line in enumerate(f):
+            row_ids[line.rstrip("\n")] = row
+    return WordVectors(vectors, row_ids)
+
+def convert(text_file, store_dir, max_words=0):
+    """
+    Convert a text vector file, one "word x1 x2 ..." line per word with an
+    optional word2vec "count dim" header line, in two streaming passes: one
+    to size the matrix and one to fill it.  Only the first vector for each
+    word is kept, and only the first max_words words (0 for all).  Returns
+    the matrix shape.
+    """
+    words = set()
+    dim = None
+    for word, values in read_vectors(text_file):
+        dim = dim or len(values)
+        words.add(word)
+        if len(words) == max_words:
+            break
+    if not dim:
+        raise ValueError("No vectors in {}".format(text_file))
+    num_words = len(words)
+
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    vectors_file = os.path.join(store_dir, VECTORS_FILE)
+    words_file = os.path.join(store_dir, WORDS_FILE)
+    vectors = np.lib.format.open_memmap(vectors_file + ".tmp",
+            mode="w+", dtype=np.float32, shape=(num_words, dim))
+    row = 0
+    with io.open(words_file + ".tmp", "w", encoding="utf-8") as f:
+        for word, values in read_vectors(text_file, dim):
+            if word not in words:
+                continue # a duplicate, or past max_words
+            words.remove(word)
+            vectors[row] = values
+            f.write(word + "\n")
+            row += 1
+            if row == num_words:
+                break
+    vectors.flush()
+    del vectors
+
+    os.rename(vectors_file + ".tmp", vectors_file)
+    os.rename(words_file + ".tmp", words_file)
+    return num_words, dim
+
+def read_vectors(text_file, dim=None):
+    """
+    Yield (word, vector) pairs from a text vector file.  Words may contain
+    spaces (as in some GloVe files), so the vector is the last dim fields.
+    """
+    with io.open(text_file, encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f):
+            fields = line.rstrip().split(" ")
+            if line_number == 0 and len(fields) == 2:
+                continue # word2vec header
+            if len(fields) < 2:
+                continue
+            if dim is None:
+                dim = len(fields) - 1
+            if len(fields) <= dim:
+                raise ValueError("Line {} of {} has fewer than {} values"
+                        .format(line_number + 1, text_file, dim))
+            yield " ".join(fields[:-dim]), np.array(fields[-dim:], dtype=np.float32)
@@ -1,127 +1,140 @@
-import tensorflow as tf
+import argparse
+import math
 import numpy as np
 import os
-import csv
-import shutil
+import sys
 import time
-import experiments/processor
 
-# Command-line parameters
-tf.flags.DEFINE_integer("max_data", -1, "Maximum number of data points to use")
-tf.flags.DEFINE_string("data_file", "data/features.csv", 
-            "File to read data from (default: 'data/features.csv')")
-tf.flags.DEFINE_string("thresholds_file", "data/thresholds.csv", 
-            "File to read thresholds from (default: 'data/thresholds.csv')")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "experiments"))
+import processor
+import feature_table
+import outcomes
+import metrics
+import naive_bayes
+import thresholds
+import sufficient_stats
 
-F = tf.flags.FLAGS
-F._parse_flags()
+# Command-line parameters
+parser = argparse.ArgumentParser()
+parser.add_argument("--data_file", default="data/features.csv",
+            help="File to read data from (default: 'data/features.csv')")
+parser.add_argument("--outcomes_file", default="data/outcomes.csv",
+            help="File to read SCDB outcomes from (default: 'data/outcomes.csv')")
+parser.add_argument("--thresholds_file", default="data/thresholds.csv",
+            help="File to read thresholds from (default: 'data/thresholds.csv')")
+parser.add_argument("--stats_file", default="data/thresholds.npz",
+            help="File to keep per-class feature statistics in (default: 'data/thresholds.npz')")
+parser.add_argument("--all", action="store_true",
+            help="Evaluate on all data (default: false)")
+parser.add_argument("--fit", action="store_true",
+            help="Fit thresholds on the training data and write them to thresholds_file (default: false)")
+parser.add_argument("--k", type=int, default=0,
+            help="Cross-validate with this many folds instead (default: 0, no cross-validation)")
+parser.add_argument("--leave_one_out", action="store_true",
+            help="Cross-validate leaving out one case at a time (default: false)")
+parser.add_argument("--add_cases", default="",
+            help="Comma-separated cases from data_file to add to the stored statistics")
+parser.add_argument("--remove_cases", default="",
+            help="Comma-separated cases from data_file to remove from the stored statistics")
+F = parser.parse_args()
 
 # Get data
 print("Loading data...")
-x = []
-y = []
-with open(F.data_file) as data_csv:
-    reader = csv.DictReader(data_csv)
-    for row in reader:
-        x.append([
-            float(row["p_minus_r"]),
-            float(row["p_interruptions"]),
-            float(row["p_words"]),
-            float(row["p_times"]),
-            float(row["p_laughter"]),
-            int(row["p_num_counsel"]),
-            int(row["p_num_int_by"]),
-            float(row["r_interruptions"]),
-            float(row["r_words"]),
-            float(row["r_times"]),
-            float(row["r_laughter"]),
-            int(row["r_num_counsel"]),
-            int(row["r_num_int_by"]),
-            float(row["j_interruptions"]),
-            float(row["j_words"]),
-            float(row["j_times"]),
-            float(row["j_laughter"]),
-            int(row["j_num"]),
-            int(row["j_num_int_by"])
-        ])
-        y.append([int(row["side"]), 1 - int(row["side"])])
-
-thresholds = {}
-with open(F.thresholds_file) as t_csv:
-    reader = csv.DictReader(t_csv)
-    for row in reader:
-        thresholds[row.key] = float(row.threshold)
-
+data = feature_table.load(F.data_file)
+data = processor.prep_data(data, outcomes.load(F.outcomes_file))
 print("Data loaded.")
 
 print("Preparing data...")
-x = np.array(x)
-y = np.array(y)
-num_features = x.shape[1]
-
-# split train vs  test
-amount = int(0.1 * len(x))
-x_train, x_eval = x[:-amount], x[-amount:]
-y_train, y_eval = y[:-amount], y[-amount:]
+cross_validating = F.k or F.leave_one_out
+keys = thresholds.KEYS if F.fit or cross_validating else naive_bayes.load_thresholds(F.thresholds_file).keys
+x = data.matrix(keys, dtype=np.float64)
+y = data["side"].astype(np.int64)
+
+# split train/test, as bayes.js does
+amount = len(x) if F.all else int(math.ceil(0.1 * len(x)))
+x_eval, y_eval = x[:amount], y[:amount]
+x_train, y_train = (x, y) if F.all else (x[amount:], y[amount:])
+cases = [str(case) for case in data.case_numbers]
+cases_train = cases if F.all else cases[amount:]
 print("Data prepared.")
 
-thresholds = np.array(thresholds)
-thresh_tensor = tf.Variable(tf.constant(thresholds))
-
-input_x = tf.placeholder(tf.float32, [None, num_features])
-output = tf.placeholder(tf.float32, [None, 2])
-split = (1 + tf.sign(input_x - thresh_tensor)) / 2
-weights = tf.Variable(
-    tf.truncated_normal([num_features, 2], stddev=0.5),
-    name="weights_output"
-        )
-scores = tf.matmul(split, weights)
-probabilities = tf.nn.softmax(scores, name="probabilities")
-predictions = tf.argmax(probabilities, dimension=1, name="predictions")
-
-loss = tf.reduce_mean(tf.abs(probabilities -  output)
-correct_predictions = tf.equal(predictions, tf.argmax(output, 1))
-accuracy = 100 * tf.reduce_mean(tf.cast(correct_predictions, "float"), name="value")
-
-with tf.Session() as session:
-    session.run(tf.initialize_all_variables())
-
-    # for all test data
-    length = len(x_eval)
-    for i in range(length):
-        feed_data = {
-                input_x: x_train,
-                output: y_train,
-            }
-        nearest_indices = session.run(indices, feed_data)
-
-        # compute accuracy
-        counts = tf.argmax(y_train[nearest_indices], 1)
-        num_respondent = float(tf.reduce_sum(counts).eval())
-        num_petitioner = F.k - num_respondent
-
-        likelihood_petitioner = num_petitioner / count_petitioner
-        likelihood_respondent = num_respondent / count_respondent
-
-        unnorm_petitioner = prob_petitioner * likelihood_petitioner
-        unnorm_respondent = prob_respondent * likelihood_respondent
-        norm_constant = unnorm_petitioner + unnorm_respondent
-
-        post_petitioner = unnorm_petitioner / norm_constant
-        post_respondent = unnorm_respondent / norm_constant
-
-        actual = np.argmax(y_eval[i, :])
-        predicted = 0 if post_petitioner >  post_respondent else 1
-        print([predicted, actual])
-        adj_amt = float(1 - abs(predicted - actual))
-        correct += adj_amt
-        if predicted == 1:
-            n_precision += 1
-            precision += adj_amt
-        if actual == 1:
-            n_recall += 1
-            recall += adj_amt
-
-    print("Accuracy: {:g}%".format(100 * correct/length))
-    print("Precision: {:g}%".format(100 * precision/n_precision))
-    print("Recall: {:g}%".format(100 * recall/n_recall))
+if cross_validating:
+    k = len(x) if F.leave_one_out else F.k
+    if not 2 <= k <= len(x):
+        parser.error("--k must be between 2 and the number of cases ({})".format(len(x)))
+    print("Cross-validating with {} folds...".format(k))
+    start_time = time.time()
+    prob, folds = sufficient_stats.cross_validate(x, y, k)
+    tested = folds >= 0
+    predicted = naive_bayes.decide(prob[tested], x[tested, keys.index("j_num")])
+    actual = y[tested]
+    folds = folds[tested]
+    elapsed = time.time() - start_time
+    print("Cross-validated {} cases in {:.3f}s.".format(len(actual), elapsed))
+
+    fold_metrics = metrics.evaluate_groups(predicted, actual, folds, k)
+    if not F.leave_one_out:
+        for fold in range(k):
+            print("TEST {}: {:.0f}%".format(fold + 1, 100 * fold_metrics[0][fold]))
+    # averaged over folds like stats.js, and pooled over all cases
+    averaged = [np.nanmean(m) for m in fold_metrics]
+    pooled = metrics.evaluate(predicted, actual)
+    for name, results in [("AVERAGED", averaged), ("POOLED", pooled)]:
+        accuracy, precision, recall, positive_rate = results
+        print("")
+        print("{} ACCURACY: {:.2f}%".format(name, 100 * accuracy))
+        print("{} PRECISION: {:.2f}%".format(name, 100 * precision))
+        print("{} RECALL: {:.2f}%".format(name, 100 * recall))
+        print("{} POSITIVE RATE: {:.2f}%".format(name, 100 * positive_rate))
+
+elif F.fit:
+    print("Fitting thresholds...")
+    start_time = time.time()
+    rows = thresholds.find_thresholds(x_train, y_train, keys)
+    stats = sufficient_stats.from_data(x_train, y_train, keys, cases_train)
+    print("Thresholds fit in {:.3f}s.".format(time.time() - start_time))
+    thresholds.write_thresholds(F.thresholds_file, rows)
+    stats.save(F.stats_file)
+    print("Wrote thresholds to {}".format(F.thresholds_file))
+    model = naive_bayes.from_thresholds(rows)
+elif F.add_cases or F.remove_cases:
+    print("Updating statistics...")
+    start_time = time.time()
+    stats = sufficient_stats.load(F.stats_file)
+    index = {case: i for i, case in enumerate(cases)}
+    add = [case.strip() for case in F.add_cases.split(",") if case.strip()]
+    remove = [case.strip() for case in F.remove_cases.split(",") if case.strip()]
+    unknown = [case for case in add + remove if case not in index]
+    if unknown:
+        parser.error("Not in {} (or without an SCDB outcome): {}".format(F.data_file, ", ".join(unknown)))
+    if stats.cases is None:
+        print("Warning: {} doesn't record its cases (refit with --fit), so cases added twice "
+                "or removed without being added can't be caught".format(F.stats_file))
+    columns = [keys.index(key) for key in stats.keys]
+    try:
+        for case in add:
+            stats.add(x[index[case], columns], y[index[case]], case)
+        for case in remove:
+            stats.remove(x[index[case], columns], y[index[case]], case)
+    except ValueError as e:
+        parser.error(e) # before anything was written
+    rows = stats.update_thresholds(thresholds.read_thresholds(F.thresholds_file))
+    print("Statistics updated in {:.3f}s.".format(time.time() - start_time))
+    thresholds.write_thresholds(F.thresholds_file, rows)
+    stats.save(F.stats_file)
+    print("Wrote thresholds to {}".format(F.thresholds_file))
+    model = naive_bayes.from_thresholds(rows)
+else:
+    model = naive_bayes.load_thresholds(F.thresholds_file)
+
+if not cross_validating:
+    start_time = time.time()
+    predicted = model.predict(x_eval)
+    accuracy, precision, recall, positive_rate = metrics.evaluate(predicted, y_eval)
+    elapsed = time.time() - start_time
+
+    print("Evaluated {} cases in {:.3f}s.".format(len(x_eval), elapsed))
+    print("ACCURACY: {:.2f}%".format(100 * accuracy))
+    print("PRECISION: {:.2f}%".format(100 * precision))
+    print("RECALL: {:.2f}%".format(100 * recall))
+    print("POSITIVE RATE: {:.2f}%".format(100 * positive_rate))